@@ -1,7 +1,87 @@
+import argparse
+import bisect
+import contextlib
+import hashlib
+import itertools
 import json
+import os
+import re
 import numpy as np
-import string
-from typing import List, Dict, Any
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from build_files import find_build_file, iter_sorted_entries, join_sorted_entries, save_json_atomic
+from instrumentation import merge_stage_seconds, profile, record_stages, save_folded_stacks, stage
+from normalization import get_normalizer, load_lexicon, tokenize_texts
+from typing import List, Dict, Any, Callable, Iterable, Iterator
+
+# Reproduce the original alignment, matching words with the original heuristic on the levenshtein distance matrix
+USE_REFERENCE_LEVENSHTEIN = False
+
+# Matrix size (in cells) above which the alignment switches to the linear memory mode
+LINEAR_MEMORY_THRESHOLD = 25_000_000
+
+# Align within a diagonal band as wide as the edit distance, at least the initial width
+USE_BANDED_ALIGNMENT = False
+INITIAL_BAND_WIDTH = 32
+
+# Bytes the back-pointers of the band may take, one per cell, above which the band falls back to the linear memory mode
+BAND_MEMORY_BYTES = 512 * 1024 * 1024
+BAND_UNREACHABLE = np.iinfo(np.int32).max // 2
+
+# Back-pointers of the levenshtein operations, a substitution also covers a match
+OPERATION_SUBSTITUTE = 0
+OPERATION_DELETE = 1
+OPERATION_INSERT = 2
+
+# Length of the unique exact matching n-grams used to split the alignment into segments, 0 disables anchoring
+ANCHOR_NGRAM_LENGTH = 0
+
+# Paths of the results, the json lines file is only used when streaming results
+RESULTS_PATH = 'build/results.json'
+RESULTS_JSONL_PATH = 'build/results.jsonl'
+
+# Path of the sufficient statistics of every scored file, mergeable across runs
+STATISTICS_PATH = 'build/statistics.json'
+
+# Prefix grouping the files in the corpus summary and the number of bootstrap samples of its WER interval
+GROUP_PATTERN = r'^[^_]+_'
+BOOTSTRAP_SAMPLES = 1000
+
+# Path of the manifest of scored jobs, used to skip the jobs whose texts did not change
+MANIFEST_PATH = 'build/analysis_manifest.json'
+
+# Text normalization settings, see normalization.DEFAULT_SETTINGS, empty keeps the original preprocessing
+NORMALIZATION = {}
+
+# Include the precision and recall of every word in the results
+PER_WORD_METRICS = False
+
+# Also align the characters of the normalized texts to calculate the Character Error Rate
+CALC_CER = False
+
+# Paths of the transcript and audio outputs without their extension, read as json lines or as the original json
+TRANSCRIPT_OUTPUT_PATH = 'build/transcript_output'
+AUDIO_OUTPUT_PATH = 'build/audio_output'
+
+# Path of the word timings saved with the audio transcripts and the seconds per window of the time breakdown
+WORD_TIMINGS_PATH = 'build/audio_words'
+TIME_WINDOW_SECONDS = 60.0
+
+# Number of files submitted to a worker at once, and the number of submitted chunks per worker kept in memory
+SCORE_CHUNK_SIZE = 8
+SCORE_CHUNKS_PER_WORKER = 4
+
+# Trace the peak memory of every stage with tracemalloc, which slows the scoring down
+TRACE_MEMORY = False
+
+# Paths of the cProfile stats and the folded stage stacks written in the profile mode
+PROFILE_PATH = 'build/profile.prof'
+FOLDED_STACKS_PATH = 'build/profile.folded'
+
+# Settings that are passed on to the worker processes, the instrumentation settings don't change the results
+INSTRUMENTATION_SETTINGS = ['TRACE_MEMORY']
+ALIGNMENT_SETTINGS = ['USE_REFERENCE_LEVENSHTEIN', 'LINEAR_MEMORY_THRESHOLD', 'USE_BANDED_ALIGNMENT', 'INITIAL_BAND_WIDTH', 'BAND_MEMORY_BYTES', 'ANCHOR_NGRAM_LENGTH', 'PER_WORD_METRICS', 'NORMALIZATION', 'CALC_CER', 'TIME_WINDOW_SECONDS']
+DEFAULT_ALIGNMENT_SETTINGS = {name: globals()[name] for name in ALIGNMENT_SETTINGS}
 
 # Function to load in a json file
 def load_json(file_path: str) -> Any:
@@ -12,14 +92,24 @@ def load_json(file_path: str) -> Any:
 def create_mapping(data: List[Dict[str, str]]) -> Dict[str, str]:
     return {item['filename']: item['text'] for item in data}
 
+# Normalizer of the NORMALIZATION settings it was resolved for, resolving it serializes the settings and the whole lexicon
+normalizer = None
+normalizer_settings = None
+
+# Function to get the normalizer of the current settings, only resolved again when the settings are replaced
+def get_preprocessor() -> Callable[[str], list[str]]:
+    global normalizer, normalizer_settings
+    if normalizer is None or normalizer_settings is not NORMALIZATION:
+        normalizer = get_normalizer(NORMALIZATION)
+        normalizer_settings = NORMALIZATION
+    return normalizer
+
 # Removes punctuation and converts to lowercase
 def preprocess_text(text: str) -> list[str]:
-    text_without_punctuation = text.translate(str.maketrans('', '', string.punctuation))
-    text_lowercase =  text_without_punctuation.lower()
-    return text_lowercase.split()
+    return get_preprocessor()(text)
 
-# Calculates the levenshtein distance matrix
-def levenshtein_distance(ref_words: list[str], hyp_words: list[str]) -> np.ndarray[float, float]:
+# Calculates the levenshtein distance matrix with the original pure python loop, kept as a reference
+def levenshtein_distance_reference(ref_words: list[str], hyp_words: list[str]) -> np.ndarray[float, float]:
     # Initialize a matrix with size |ref_words|+1 x |hyp_words|+1
     # The extra row and column are for the case when one of the strings is empty
     ld = np.zeros((len(ref_words) + 1, len(hyp_words) + 1))
@@ -41,6 +131,296 @@ def levenshtein_distance(ref_words: list[str], hyp_words: list[str]) -> np.ndarr
 
     return ld
 
+# Function to intern the words of both arrays to shared integer token ids
+def intern_words(ref_words: list[str], hyp_words: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    vocabulary = {}
+    ref_ids = np.fromiter((vocabulary.setdefault(word, len(vocabulary)) for word in ref_words), dtype=np.int32, count=len(ref_words))
+    hyp_ids = np.fromiter((vocabulary.setdefault(word, len(vocabulary)) for word in hyp_words), dtype=np.int32, count=len(hyp_words))
+    return ref_ids, hyp_ids
+
+# Function to get the smallest signed integer type able to hold every distance in the matrix
+def get_distance_dtype(ref_length: int, hyp_length: int) -> np.dtype:
+    # Signed because the row scan subtracts the column index from the candidates
+    return np.int16 if ref_length + hyp_length < np.iinfo(np.int16).max else np.int32
+
+# Function to calculate the next row of the levenshtein distance matrix in place
+def levenshtein_row(previous: np.ndarray, row: np.ndarray, i: int, ref_id: int, hyp_ids: np.ndarray, columns: np.ndarray) -> None:
+    # Substitution (or match) from the diagonal and deletion from the row above
+    row[0] = i
+    np.minimum(previous[:-1] + (hyp_ids != ref_id), previous[1:] + 1, out=row[1:])
+
+    # Insertions chain along the row: ld[i, j] = min over k <= j of row[k] + (j - k)
+    np.subtract(row, columns, out=row)
+    np.minimum.accumulate(row, out=row)
+    row += columns
+
+# Calculates the levenshtein distance matrix, vectorized per row over interned token ids
+# The matrix holds int16 or int32 distances, or floats when the original implementation is used
+def levenshtein_distance(ref_words: list[str], hyp_words: list[str], reference: bool = False) -> np.ndarray:
+    # Fall back to the original implementation when requested
+    if reference:
+        return levenshtein_distance_reference(ref_words, hyp_words)
+
+    ref_ids, hyp_ids = intern_words(ref_words, hyp_words)
+    dtype = get_distance_dtype(len(ref_ids), len(hyp_ids))
+    ld = np.empty((len(ref_ids) + 1, len(hyp_ids) + 1), dtype=dtype)
+
+    # Base cases: number of operations for an empty hypothesis/reference
+    columns = np.arange(len(hyp_ids) + 1, dtype=dtype)
+    ld[0] = columns
+
+    for i in range(1, len(ref_ids) + 1):
+        levenshtein_row(ld[i - 1], ld[i], i, ref_ids[i - 1], hyp_ids, columns)
+
+    return ld
+
+# Calculates only the last row of the levenshtein distance matrix using two rows of memory
+def levenshtein_last_row(ref_ids: np.ndarray, hyp_ids: np.ndarray) -> np.ndarray:
+    dtype = get_distance_dtype(len(ref_ids), len(hyp_ids))
+    columns = np.arange(len(hyp_ids) + 1, dtype=dtype)
+    previous = columns.copy()
+    row = np.empty_like(previous)
+
+    for i in range(1, len(ref_ids) + 1):
+        levenshtein_row(previous, row, i, ref_ids[i - 1], hyp_ids, columns)
+        previous, row = row, previous
+
+    return previous
+
+# Function to find the matching words of an optimal alignment with hirschberg's divide and conquer
+def map_hirschberg_alignments(ref_ids: np.ndarray, hyp_ids: np.ndarray, value_alignments: list[int], ref_offset: int = 0, hyp_offset: int = 0) -> None:
+    # Nothing can match when either side is empty
+    if len(ref_ids) == 0 or len(hyp_ids) == 0:
+        return
+
+    # A single reference word matches its first occurrence in the hypothesis, if any
+    if len(ref_ids) == 1:
+        matches = np.flatnonzero(hyp_ids == ref_ids[0])
+        if len(matches) > 0:
+            value_alignments[ref_offset] = hyp_offset + int(matches[0])
+        return
+
+    # Split the reference in half and find where the optimal path crosses the middle row
+    middle = len(ref_ids) // 2
+    forward = levenshtein_last_row(ref_ids[:middle], hyp_ids)
+    backward = levenshtein_last_row(ref_ids[middle:][::-1], hyp_ids[::-1])
+    split = int(np.argmin(forward.astype(np.int64) + backward[::-1]))
+
+    # Solve both halves independently
+    map_hirschberg_alignments(ref_ids[:middle], hyp_ids[:split], value_alignments, ref_offset, hyp_offset)
+    map_hirschberg_alignments(ref_ids[middle:], hyp_ids[split:], value_alignments, ref_offset + middle, hyp_offset + split)
+
+# Function to map value alignments in linear memory, without building the levenshtein distance matrix
+def map_aligning_values_linear(ref_words: list[str], hyp_words: list[str], token_ids: tuple[np.ndarray, np.ndarray] = None) -> list[int]:
+    value_alignments = [None] * len(ref_words)
+    ref_ids, hyp_ids = token_ids or intern_words(ref_words, hyp_words)
+    map_hirschberg_alignments(ref_ids, hyp_ids, value_alignments)
+    return value_alignments
+
+# Calculates only the levenshtein distance using the bit-parallel algorithm of Myers and Hyyrö
+def levenshtein_distance_value(ref_words: list[str], hyp_words: list[str]) -> int:
+    # Trivial cases where one of the arrays is empty
+    if not ref_words or not hyp_words:
+        return len(ref_words) + len(hyp_words)
+
+    # Build a bit mask of reference positions for every word
+    match_masks = {}
+    for i, word in enumerate(ref_words):
+        match_masks[word] = match_masks.get(word, 0) | (1 << i)
+
+    # Vertical positive and negative deltas of the current column, stored as bit vectors
+    all_bits = (1 << len(ref_words)) - 1
+    last_bit = 1 << (len(ref_words) - 1)
+    positive_vertical = all_bits
+    negative_vertical = 0
+    distance = len(ref_words)
+
+    for word in hyp_words:
+        matches = match_masks.get(word, 0)
+        vertical_changes = matches | negative_vertical
+        horizontal_changes = (((matches & positive_vertical) + positive_vertical) ^ positive_vertical) | matches
+        positive_horizontal = negative_vertical | (~(horizontal_changes | positive_vertical) & all_bits)
+        negative_horizontal = positive_vertical & horizontal_changes
+
+        # Track the distance in the last row
+        if positive_horizontal & last_bit:
+            distance += 1
+        elif negative_horizontal & last_bit:
+            distance -= 1
+
+        # Shift in the first row, which grows by one for every hypothesis word
+        positive_horizontal = ((positive_horizontal << 1) | 1) & all_bits
+        negative_horizontal = (negative_horizontal << 1) & all_bits
+        positive_vertical = negative_horizontal | (~(vertical_changes | positive_horizontal) & all_bits)
+        negative_vertical = positive_horizontal & vertical_changes
+
+    return distance
+
+# Function to calculate the back-pointers of the levenshtein operations restricted to a diagonal band
+def levenshtein_band(ref_ids: np.ndarray, hyp_ids: np.ndarray, lowest_diagonal: int, highest_diagonal: int) -> np.ndarray:
+    # Row i stores the cells j = i + lowest_diagonal + t, cells outside the matrix stay unreachable
+    width = highest_diagonal - lowest_diagonal + 1
+    offsets = np.arange(width, dtype=np.int32)
+
+    # Only two rows of distances are kept, the operations take one byte per cell
+    operations = np.empty((len(ref_ids) + 1, width), dtype=np.uint8)
+    operations[0] = OPERATION_INSERT
+
+    # Hypothesis ids padded so every band column can be looked up, the padding never matches
+    padded_hyp_ids = np.append(hyp_ids, -1)
+
+    # Base case: the first row counts the insertions
+    columns = lowest_diagonal + offsets
+    outside = (columns < 0) | (columns > len(hyp_ids))
+    previous = np.where(outside, BAND_UNREACHABLE, columns).astype(np.int32)
+    row = np.empty_like(previous)
+
+    diagonal = np.empty(width, dtype=np.int32)
+    candidates = np.empty(width, dtype=np.int32)
+    for i in range(1, len(ref_ids) + 1):
+        columns = i + lowest_diagonal + offsets
+        outside = (columns < 0) | (columns > len(hyp_ids))
+
+        # Substitution (or match) from the same band column, deletion from the next one
+        costs = padded_hyp_ids[np.clip(columns - 1, 0, len(hyp_ids))] != ref_ids[i - 1]
+        np.add(previous, costs, out=diagonal)
+        diagonal[columns == 0] = BAND_UNREACHABLE
+        np.minimum(diagonal[:-1], previous[1:] + 1, out=candidates[:-1])
+        candidates[-1] = diagonal[-1]
+        candidates[columns == 0] = i
+        candidates[outside] = BAND_UNREACHABLE
+
+        # Insertions chain along the row like in the full matrix
+        np.subtract(candidates, offsets, out=row)
+        np.minimum.accumulate(row, out=row)
+        row += offsets
+        row[outside] = BAND_UNREACHABLE
+
+        # Prefer the diagonal, then the deletion, then the insertion
+        operations[i] = np.where(row == diagonal, OPERATION_SUBSTITUTE, np.where(row == candidates, OPERATION_DELETE, OPERATION_INSERT))
+        previous, row = row, previous
+
+    return operations
+
+# Function to trace the matching words of an optimal alignment back through the operations, stored per band column when a lowest diagonal is given
+def trace_alignments(operations: np.ndarray, ref_ids: np.ndarray, hyp_ids: np.ndarray, lowest_diagonal: int = None) -> list[int]:
+    value_alignments = [None] * len(ref_ids)
+
+    i, j = len(ref_ids), len(hyp_ids)
+    while i > 0 and j > 0:
+        operation = operations[i, j if lowest_diagonal is None else j - i - lowest_diagonal]
+        if operation == OPERATION_SUBSTITUTE:
+            i, j = i - 1, j - 1
+            if ref_ids[i] == hyp_ids[j]:
+                value_alignments[i] = j
+        elif operation == OPERATION_DELETE:
+            i -= 1
+        else:
+            j -= 1
+
+    return value_alignments
+
+# Function to map value alignments within a diagonal band just wide enough to contain the optimal path
+def map_aligning_values_banded(ref_words: list[str], hyp_words: list[str], token_ids: tuple[np.ndarray, np.ndarray] = None) -> list[int]:
+    ref_ids, hyp_ids = token_ids or intern_words(ref_words, hyp_words)
+    length_difference = len(hyp_ids) - len(ref_ids)
+
+    # A path leaving the band costs more than band_width, so a band as wide as the bit-parallel distance is exact
+    band_width = max(INITIAL_BAND_WIDTH, levenshtein_distance_value(ref_ids.tolist(), hyp_ids.tolist()))
+    if 2 * band_width + abs(length_difference) < len(hyp_ids):
+        lowest_diagonal = min(0, length_difference) - band_width
+        highest_diagonal = max(0, length_difference) + band_width
+
+        # A band that would not fit in its memory budget is no better than the linear alignment
+        if (len(ref_ids) + 1) * (highest_diagonal - lowest_diagonal + 1) > BAND_MEMORY_BYTES:
+            return map_aligning_values_linear(ref_words, hyp_words, (ref_ids, hyp_ids))
+        operations = levenshtein_band(ref_ids, hyp_ids, lowest_diagonal, highest_diagonal)
+        return trace_alignments(operations, ref_ids, hyp_ids, lowest_diagonal)
+
+    # The band would cover most of the matrix, use the exact full alignment instead
+    if (len(ref_ids) + 1) * (len(hyp_ids) + 1) > LINEAR_MEMORY_THRESHOLD:
+        return map_aligning_values_linear(ref_words, hyp_words, (ref_ids, hyp_ids))
+    return trace_alignments(levenshtein_operations(ref_ids, hyp_ids), ref_ids, hyp_ids)
+
+# Function to find long exact matching n-gram runs that occur only once in both word arrays
+def find_alignment_anchors(ref_words: list[str], hyp_words: list[str], ngram_length: int) -> list[tuple[int, int, int]]:
+    # Function to index the unique n-grams of a word array by position
+    def unique_ngrams(words: list[str]) -> dict[tuple[str, ...], int]:
+        positions = {}
+        for position in range(len(words) - ngram_length + 1):
+            ngram = tuple(words[position:position + ngram_length])
+            positions[ngram] = -1 if ngram in positions else position
+        return positions
+
+    ref_ngrams = unique_ngrams(ref_words)
+    hyp_ngrams = unique_ngrams(hyp_words)
+    pairs = sorted((position, hyp_ngrams[ngram]) for ngram, position in ref_ngrams.items() if position >= 0 and hyp_ngrams.get(ngram, -1) >= 0)
+
+    # Keep the longest chain of pairs that is increasing in both arrays (patience sorting)
+    tails = []
+    tail_indices = []
+    predecessors = [None] * len(pairs)
+    for index, (_, hyp_position) in enumerate(pairs):
+        k = bisect.bisect_left(tails, hyp_position)
+        predecessors[index] = tail_indices[k - 1] if k > 0 else None
+        if k == len(tails):
+            tails.append(hyp_position)
+            tail_indices.append(index)
+        else:
+            tails[k] = hyp_position
+            tail_indices[k] = index
+    chain = []
+    index = tail_indices[-1] if tail_indices else None
+    while index is not None:
+        chain.append(pairs[index])
+        index = predecessors[index]
+    chain.reverse()
+
+    # Merge the chained n-grams into non-overlapping runs of (ref start, hyp start, length)
+    anchors = []
+    for ref_position, hyp_position in chain:
+        if anchors:
+            ref_start, hyp_start, length = anchors[-1]
+            if ref_position - ref_start == hyp_position - hyp_start and ref_position <= ref_start + length:
+                anchors[-1] = (ref_start, hyp_start, ref_position + ngram_length - ref_start)
+                continue
+            if ref_position < ref_start + length or hyp_position < hyp_start + length:
+                continue
+        anchors.append((ref_position, hyp_position, ngram_length))
+
+    return anchors
+
+# Function to map value alignments between anchors, aligning each segment independently
+def map_aligning_values_anchored(ref_words: list[str], hyp_words: list[str], ngram_length: int) -> list[int]:
+    value_alignments = [None] * len(ref_words)
+    ref_end, hyp_end = 0, 0
+
+    for ref_start, hyp_start, length in find_alignment_anchors(ref_words, hyp_words, ngram_length) + [(len(ref_words), len(hyp_words), 0)]:
+        # Align the segment leading up to the anchor
+        segment_alignments = map_aligning_values_banded(ref_words[ref_end:ref_start], hyp_words[hyp_end:hyp_start])
+        for i, alignment in enumerate(segment_alignments):
+            if alignment != None:
+                value_alignments[ref_end + i] = hyp_end + alignment
+
+        # The anchored words match one to one
+        for k in range(length):
+            value_alignments[ref_start + k] = hyp_start + k
+        ref_end, hyp_end = ref_start + length, hyp_start + length
+
+    # Anchors are a heuristic, when they forced a worse path than the edit distance allows align without them
+    if count_alignment_errors(value_alignments, len(hyp_words)) > levenshtein_distance_value(ref_words, hyp_words):
+        return map_aligning_values_banded(ref_words, hyp_words)
+    return value_alignments
+
+# Function to count the errors of an alignment of matching words, the unmatched words between matches pair up as substitutions
+def count_alignment_errors(value_alignments: list[int], hyp_length: int) -> int:
+    errors = 0
+    ref_index, hyp_index = 0, 0
+    for ref_end, hyp_end in [(i, alignment) for i, alignment in enumerate(value_alignments) if alignment != None] + [(len(value_alignments), hyp_length)]:
+        errors += max(ref_end - ref_index, hyp_end - hyp_index)
+        ref_index, hyp_index = ref_end + 1, hyp_end + 1
+    return errors
+
 # Function to map value allignments using the levenshtein distance matrix
 def map_aligning_values(ld: np.ndarray[float, float]) -> list[int]:
     # Create an array of the same length as ld and initialize it as None
@@ -152,6 +532,137 @@ def align_word_arrays(value_alignments: list[int], transcript_words: list[str],
 
     return aligned_transcript, aligned_audio
 
+# Function to calculate the levenshtein operations, recording a back-pointer for every cell of the matrix
+def levenshtein_operations(ref_ids: np.ndarray, hyp_ids: np.ndarray) -> np.ndarray:
+    # Only two rows of distances are kept, the operations take one byte per cell
+    operations = np.empty((len(ref_ids) + 1, len(hyp_ids) + 1), dtype=np.uint8)
+    operations[0] = OPERATION_INSERT
+    operations[:, 0] = OPERATION_DELETE
+
+    dtype = get_distance_dtype(len(ref_ids), len(hyp_ids))
+    columns = np.arange(len(hyp_ids) + 1, dtype=dtype)
+    previous = columns.copy()
+    row = np.empty_like(previous)
+
+    for i in range(1, len(ref_ids) + 1):
+        levenshtein_row(previous, row, i, ref_ids[i - 1], hyp_ids, columns)
+
+        # Prefer the diagonal, then the deletion, then the insertion
+        diagonal = row[1:] == previous[:-1] + (hyp_ids != ref_ids[i - 1])
+        deletion = row[1:] == previous[1:] + 1
+        operations[i, 1:] = np.where(diagonal, OPERATION_SUBSTITUTE, np.where(deletion, OPERATION_DELETE, OPERATION_INSERT))
+        previous, row = row, previous
+
+    return operations
+
+# Function to build the aligned word arrays and count the errors in a single traceback of the operations
+def trace_operations(operations: np.ndarray, ref_words: list[str], hyp_words: list[str]) -> tuple[list[str], list[str], tuple[int, int, int, int]]:
+    substitutions = 0
+    deletions = 0
+    insertions = 0
+    corrects = 0
+
+    # Walk back from the last cell, building the arrays in reverse
+    reference = []
+    recognized = []
+    i, j = len(ref_words), len(hyp_words)
+    while i > 0 or j > 0:
+        operation = operations[i, j]
+        if operation == OPERATION_SUBSTITUTE:
+            i, j = i - 1, j - 1
+            reference.append(ref_words[i])
+            recognized.append(hyp_words[j])
+            if ref_words[i] == hyp_words[j]:
+                corrects += 1
+            else:
+                substitutions += 1
+        elif operation == OPERATION_DELETE:
+            i -= 1
+            reference.append(ref_words[i])
+            recognized.append(None)
+            deletions += 1
+        else:
+            j -= 1
+            reference.append(None)
+            recognized.append(hyp_words[j])
+            insertions += 1
+
+    reference.reverse()
+    recognized.reverse()
+    return reference, recognized, (substitutions, deletions, insertions, corrects)
+
+# Function to build the aligned word arrays and count the errors from the matching words in a single pass
+def align_matched_words(value_alignments: list[int], ref_words: list[str], hyp_words: list[str]) -> tuple[list[str], list[str], tuple[int, int, int, int]]:
+    substitutions = 0
+    deletions = 0
+    insertions = 0
+    corrects = 0
+
+    reference = []
+    recognized = []
+    ref_index, hyp_index = 0, 0
+    for ref_end, hyp_end in [(i, alignment) for i, alignment in enumerate(value_alignments) if alignment != None] + [(len(ref_words), len(hyp_words))]:
+        # Pair up the unmatched words before the match, the remainder are deletions or insertions
+        paired = min(ref_end - ref_index, hyp_end - hyp_index)
+        for k in range(paired):
+            reference.append(ref_words[ref_index + k])
+            recognized.append(hyp_words[hyp_index + k])
+            if ref_words[ref_index + k] == hyp_words[hyp_index + k]:
+                corrects += 1
+            else:
+                substitutions += 1
+        for k in range(ref_index + paired, ref_end):
+            reference.append(ref_words[k])
+            recognized.append(None)
+            deletions += 1
+        for k in range(hyp_index + paired, hyp_end):
+            reference.append(None)
+            recognized.append(hyp_words[k])
+            insertions += 1
+
+        # Append the matching words
+        if ref_end < len(ref_words):
+            reference.append(ref_words[ref_end])
+            recognized.append(hyp_words[hyp_end])
+            corrects += 1
+        ref_index, hyp_index = ref_end + 1, hyp_end + 1
+
+    return reference, recognized, (substitutions, deletions, insertions, corrects)
+
+# Function to align two word arrays, returning the aligned arrays with None for missing words and the S, D, I and C counts
+def align(ref_words: list[str], hyp_words: list[str], token_ids: tuple[np.ndarray, np.ndarray] = None) -> tuple[list[str], list[str], tuple[int, int, int, int]]:
+    # Reproduce the original alignment when requested
+    if USE_REFERENCE_LEVENSHTEIN:
+        with stage('Levenshtein'):
+            ld = levenshtein_distance(ref_words, hyp_words)
+        with stage('Value Alignment'):
+            value_alignments = map_aligning_values(ld)
+        with stage('Word Alignment'):
+            reference, recognized = align_word_arrays(value_alignments, ref_words, hyp_words)
+            return reference, recognized, analyse_aligned_words(reference, recognized)
+
+    # Split the problem on exact matching runs or restrict it to a band when enabled
+    with stage('Value Alignment'):
+        if ANCHOR_NGRAM_LENGTH > 0:
+            value_alignments = map_aligning_values_anchored(ref_words, hyp_words, ANCHOR_NGRAM_LENGTH)
+        elif USE_BANDED_ALIGNMENT:
+            value_alignments = map_aligning_values_banded(ref_words, hyp_words, token_ids)
+        elif (len(ref_words) + 1) * (len(hyp_words) + 1) > LINEAR_MEMORY_THRESHOLD:
+            # Avoid building the full matrix when it would not fit comfortably in memory
+            value_alignments = map_aligning_values_linear(ref_words, hyp_words, token_ids)
+        else:
+            value_alignments = None
+
+    if value_alignments is None:
+        ref_ids, hyp_ids = token_ids or intern_words(ref_words, hyp_words)
+        with stage('Levenshtein'):
+            operations = levenshtein_operations(ref_ids, hyp_ids)
+        with stage('Traceback'):
+            return trace_operations(operations, ref_words, hyp_words)
+
+    with stage('Word Alignment'):
+        return align_matched_words(value_alignments, ref_words, hyp_words)
+
 # Function to analyze aligned text
 def analyse_aligned_words(reference: list[str], recognized: list[str]) -> tuple[int, int, int, int]:
     substitutions = 0
@@ -186,18 +697,13 @@ def calc_wcr(C: int, N: int) -> float:
 
 # Function to compare matching texts according to filenames
 def prepare_job_texts(transcript_text: str, audio_text: str) -> None:
-    # Preprocess the text strings to normalized word arrays
-    transcript_words = preprocess_text(transcript_text)
-    audio_words = preprocess_text(audio_text)
-
-    # Get the levenshtein distance
-    ld = levenshtein_distance(transcript_words, audio_words)
-
-    # Allign the words in the levenshtein distance array
-    value_alignments = map_aligning_values(ld)
+    # Preprocess the text strings to normalized word arrays and their token ids
+    with stage('Preprocess'):
+        (transcript_words, audio_words), token_ids = tokenize_texts([transcript_text, audio_text], normalize=get_preprocessor())
 
     # Allign the two word arrays
-    reference, recognized = align_word_arrays(value_alignments, transcript_words, audio_words)
+    with stage('Alignment'):
+        reference, recognized, _ = align(transcript_words, audio_words, tuple(token_ids))
     total_reference_words = len(transcript_words)
     return reference, recognized, total_reference_words
 
@@ -264,19 +770,24 @@ def calc_macro_score(true_positives: dict[str, int], elements: dict[str, int]) -
     total_elements = len(elements)
     return (1 / total_elements) * elements_sum
 
-# Function to load and save the results
-def load_and_save_results(filename: str, data: dict[str, float]):
-    results = load_json('build/results.json')
-    
-    # Update the entry
-    for entry in results:
-        if entry['filename'] == filename:
-            entry.update(data)
-            break
-    
-    # Save the change
-    with open('build/results.json', 'w') as file:
-        json.dump(results, file, indent=2)
+# Function to load the results keyed by filename, an in-memory accumulator that is saved once
+def load_results(file_path: str = RESULTS_PATH) -> dict[str, dict[str, Any]]:
+    if not os.path.exists(file_path):
+        return {}
+    return {entry['filename']: entry for entry in load_json(file_path)}
+
+# Function to update the accumulated results of a filename
+def update_results(results: dict[str, dict[str, Any]], filename: str, data: dict[str, float]) -> None:
+    results.setdefault(filename, {"filename": filename}).update(data)
+
+# Function to save the accumulated results at once
+def save_results(results: dict[str, dict[str, Any]], file_path: str = RESULTS_PATH) -> None:
+    save_json_atomic(file_path, list(results.values()))
+
+# Function to append the results of a filename as a json line, without rewriting earlier results
+def append_results_line(filename: str, data: dict[str, float], file_path: str = RESULTS_JSONL_PATH) -> None:
+    with open(file_path, 'a') as file:
+        file.write(json.dumps({"filename": filename, **data}) + '\n')
 
 # Function to calculate the precision of a specific word
 def get_precision(reference, recognized, target):
@@ -301,103 +812,457 @@ def get_recall(reference, recognized, target):
                 TP += 1
     return TP / RE
 
-def main() -> None:
-    # Path to the transcript json file
-    transcript_file_path = 'build/transcript_output.json'
+# Function to get the alignment settings so they can be passed on to worker processes
+def get_alignment_settings() -> dict[str, Any]:
+    return {name: globals()[name] for name in ALIGNMENT_SETTINGS}
 
-    # Path to the audio json file
-    audio_file_path = 'build/audio_output.json'
+# Function to apply alignment settings, used as the initializer of the worker processes
+def set_alignment_settings(settings: dict[str, Any]) -> None:
+    globals().update(settings)
 
-    # Load JSON data
-    transcript_data = load_json(transcript_file_path)
-    audio_data = load_json(audio_file_path)
+# Function to collect the sufficient statistics of the aligned word arrays in a single traversal
+def calc_aligned_statistics(reference: list[str], recognized: list[str], N: int) -> dict[str, Any]:
+    substitutions = 0
+    deletions = 0
+    insertions = 0
+    corrects = 0
+    selected_elements = {}
+    relevant_elements = {}
+    true_positives = {}
 
-    # Create a dictionary to store 'filename' -> 'text' mapping for the audio data
-    audio_mapping = create_mapping(audio_data)
+    for reference_word, recognized_word in zip(reference, recognized):
+        if reference_word == None:
+            insertions += 1
+        else:
+            relevant_elements[reference_word] = relevant_elements.get(reference_word, 0) + 1
+        if recognized_word == None:
+            deletions += 1
+            continue
+        selected_elements[recognized_word] = selected_elements.get(recognized_word, 0) + 1
+        if reference_word == recognized_word:
+            corrects += 1
+            true_positives[reference_word] = true_positives.get(reference_word, 0) + 1
+        elif reference_word != None:
+            substitutions += 1
 
-    # Loop through each of the transcript entries
-    for transcript_entry in transcript_data:
-        filename = transcript_entry['filename']
-        transcript_text = transcript_entry['text']
-
-        # Fetch an audio text with matching filenames
-        if filename in audio_mapping:
-            audio_text = audio_mapping[filename]
-
-            # compare the transcript and audio text
-            reference, recognized, N = prepare_job_texts(transcript_text, audio_text)
-            
-            print(f'\n{filename}:')
-
-            # Print the amount of words
-            print(f'- N: {N}')
-
-            # Get all of the information needed to calculate errors for audio recognition
-            S, D, I, C = analyse_aligned_words(reference, recognized)
-
-            # Get the WER
-            WER = calc_wer(S, D, I, N)
-            print(f'- WER: {round(WER, 4)}')
-
-            # Get the WRR
-            WRR = calc_wrr(C, I, N)
-            print(f'- WRR: {round(WRR, 4)}')
-
-            # Get the WCR
-            WCR = calc_wcr(C, N)
-            print(f'- WCR: {round(WCR, 4)}')
-
-            # Get the selected and relevant elements and the true positives
-            selected_elements = get_selected_elements(recognized)
-            relevant_elements = get_relevant_elements(reference)
-            true_positives = get_true_positives(reference, recognized)
-
-            # Sum of True Positives
-            true_positives_sum = get_dictionary_sum(true_positives)
-
-            # Micro Precision
-            recognized_len = len(recognized)
-            for word in recognized:
-                if word == None:
-                    recognized_len -= 1
-            micro_precision = true_positives_sum / recognized_len
-
-            # Micro Recall
-            reference_len = len(reference)
-            for word in reference:
-                if word == None:
-                    reference_len -= 1
-            micro_recall = true_positives_sum / reference_len
-            print(f'- Micro Precision: {round(micro_precision, 4)}, Micro Recall: {round(micro_recall, 4)}')
-
-            # Calculate the macro precision and recall
-            macro_precision = calc_macro_score(true_positives, selected_elements)
-            macro_recall = calc_macro_score(true_positives, relevant_elements)
-            print(f'- Macro Precision: {round(macro_precision, 4)}, Macro Recall: {round(macro_recall, 4)}')
-
-            # Calculate the F-Scores
-            micro_f_score = (2 * micro_precision * micro_recall) / (micro_precision + micro_recall)
-            macro_f_score = (2 * macro_precision * macro_recall) / (macro_precision + macro_recall)
-            print(f'- Micro f-score: {round(micro_f_score, 4)}, Macro f-score: {round(macro_f_score, 4)}')
-
-            # Save the data to the results json
-            load_and_save_results(filename, {
-                "Substitutions": S,
-                "Deletions": D,
-                "Insertions": I,
-                "Corrects": C,
-                "WER": WER,
-                "WRR": WRR,
-                "WCR": WCR,
-                "Micro Precision": micro_precision,
-                "Micro Recall": micro_recall,
-                "Micro F-Score": micro_f_score,
-                "Macro Precision": macro_precision,
-                "Macro Recall": macro_recall,
-                "Macro F-Score": macro_f_score
-            })
+    return {
+        "N": N,
+        "Substitutions": substitutions,
+        "Deletions": deletions,
+        "Insertions": insertions,
+        "Corrects": corrects,
+        "Selected": selected_elements,
+        "Relevant": relevant_elements,
+        "True Positives": true_positives
+    }
+
+# Function to count the character errors between the normalized texts, the bit-parallel distance keeps this practical
+def calc_character_statistics(transcript_text: str, audio_text: str) -> dict[str, int]:
+    reference_characters = ' '.join(preprocess_text(transcript_text))
+    recognized_characters = ' '.join(preprocess_text(audio_text))
+    return {"Characters": len(reference_characters), "Character Errors": levenshtein_distance_value(reference_characters, recognized_characters)}
+
+# Function to normalize the timed words of a transcript, every normalized word keeps the speaker and start time of its element
+def get_timed_words(word_timings: dict[str, list]) -> tuple[list[str], list[str], list[float]]:
+    normalize = get_preprocessor()
+    words = []
+    speakers = []
+    starts = []
+    for value, speaker, start in zip(word_timings['words'], word_timings['speakers'], word_timings['start']):
+        for word in normalize(value):
+            words.append(word)
+            speakers.append(str(speaker))
+            starts.append(start)
+    return words, speakers, starts
+
+# Function to count the errors per speaker and per time window, a deleted word belongs to the recognized word before it
+def calc_breakdown_statistics(reference: list[str], recognized: list[str], speakers: list[str], starts: list[float]) -> dict[str, Any]:
+    breakdowns = {"Speakers": {}, "Windows": {}}
+    if not speakers:
+        return breakdowns
+
+    next_index = 0
+    for reference_word, recognized_word in zip(reference, recognized):
+        if recognized_word == None:
+            index = max(next_index - 1, 0)
+            operation = "Deletions"
+        else:
+            index = next_index
+            next_index += 1
+            if reference_word == None:
+                operation = "Insertions"
+            elif reference_word == recognized_word:
+                operation = "Corrects"
+            else:
+                operation = "Substitutions"
+
+        keys = [("Speakers", speakers[index])]
+        if starts[index] is not None:
+            keys.append(("Windows", f'{int(starts[index] // TIME_WINDOW_SECONDS) * TIME_WINDOW_SECONDS:g}'))
+        for breakdown, key in keys:
+            counts = breakdowns[breakdown].setdefault(key, {"Substitutions": 0, "Deletions": 0, "Insertions": 0, "Corrects": 0})
+            counts[operation] += 1
+
+    return breakdowns
+
+# Function to calculate the WER of the error counts of a speaker or time window
+def calc_breakdown_metrics(counts: dict[str, int]) -> dict[str, Any]:
+    N = counts["Substitutions"] + counts["Deletions"] + counts["Corrects"]
+    errors = counts["Substitutions"] + counts["Deletions"] + counts["Insertions"]
+    return {"N": N, **counts, "WER": errors / N if N else None}
+
+# Function to merge sufficient statistics, so files, workers or shards can be combined in any grouping
+def merge_statistics(total: dict[str, Any], statistics: dict[str, Any]) -> dict[str, Any]:
+    for key, value in statistics.items():
+        if isinstance(value, dict):
+            # Word counters and the nested speaker and time window counts
+            merge_statistics(total.setdefault(key, {}), value)
         else:
+            total[key] = total.get(key, 0) + value
+    return total
+
+# Function to calculate the metrics from sufficient statistics
+def calc_statistics_metrics(statistics: dict[str, Any], per_word: bool = False) -> dict[str, Any]:
+    N = statistics["N"]
+    substitutions = statistics["Substitutions"]
+    deletions = statistics["Deletions"]
+    insertions = statistics["Insertions"]
+    corrects = statistics["Corrects"]
+    selected_elements = statistics["Selected"]
+    relevant_elements = statistics["Relevant"]
+    true_positives = statistics["True Positives"]
+
+    # Micro scores over every word, the true positives are the correct words
+    micro_precision = corrects / (corrects + substitutions + insertions)
+    micro_recall = corrects / (corrects + substitutions + deletions)
+
+    # Macro scores averaged over the distinct words
+    macro_precision = calc_macro_score(true_positives, selected_elements)
+    macro_recall = calc_macro_score(true_positives, relevant_elements)
+
+    metrics = {
+        "Substitutions": substitutions,
+        "Deletions": deletions,
+        "Insertions": insertions,
+        "Corrects": corrects,
+        "WER": calc_wer(substitutions, deletions, insertions, N),
+        "WRR": calc_wrr(corrects, insertions, N),
+        "WCR": calc_wcr(corrects, N),
+        "Micro Precision": micro_precision,
+        "Micro Recall": micro_recall,
+        "Micro F-Score": (2 * micro_precision * micro_recall) / (micro_precision + micro_recall),
+        "Macro Precision": macro_precision,
+        "Macro Recall": macro_recall,
+        "Macro F-Score": (2 * macro_precision * macro_recall) / (macro_precision + macro_recall)
+    }
+
+    # Character Error Rate, and the WER per speaker and per time window, when they were counted
+    if "Characters" in statistics:
+        metrics["CER"] = statistics["Character Errors"] / statistics["Characters"]
+    if "Speakers" in statistics:
+        metrics["Speakers"] = {speaker: calc_breakdown_metrics(counts) for speaker, counts in sorted(statistics["Speakers"].items())}
+    if "Windows" in statistics:
+        metrics["Windows"] = {window: calc_breakdown_metrics(counts) for window, counts in sorted(statistics["Windows"].items(), key=lambda item: float(item[0]))}
+
+    # Precision and recall of every word that was either recognized or referenced
+    if per_word:
+        metrics["Per-Word"] = {
+            word: {
+                "Precision": true_positives.get(word, 0) / selected_elements[word] if word in selected_elements else None,
+                "Recall": true_positives.get(word, 0) / relevant_elements[word] if word in relevant_elements else None
+            }
+            for word in relevant_elements | selected_elements
+        }
+
+    return metrics
+
+# Function to calculate every metric of the aligned word arrays in a single traversal
+def calc_aligned_metrics(reference: list[str], recognized: list[str], N: int, per_word: bool = False) -> dict[str, Any]:
+    return calc_statistics_metrics(calc_aligned_statistics(reference, recognized, N), per_word)
+
+# Function to get the group of a filename from its prefix, like the test1_ names in the transcripts
+def get_group(filename: str, pattern: str = None) -> str:
+    match = re.match(pattern or GROUP_PATTERN, filename)
+    return match.group(0) if match else 'ungrouped'
+
+# Function to calculate a bootstrap confidence interval of the pooled WER by resampling files
+def calc_wer_interval(statistics_list: list[dict[str, Any]], samples: int = BOOTSTRAP_SAMPLES, confidence: float = 0.95, seed: int = 0) -> list[float]:
+    errors = np.array([statistics["Substitutions"] + statistics["Deletions"] + statistics["Insertions"] for statistics in statistics_list], dtype=np.float64)
+    totals = np.array([statistics["N"] for statistics in statistics_list], dtype=np.float64)
+
+    # Every row is one resampled corpus of the same number of files
+    indices = np.random.default_rng(seed).integers(0, len(statistics_list), (samples, len(statistics_list)))
+    wers = errors[indices].sum(axis=1) / totals[indices].sum(axis=1)
+    tail = (1 - confidence) / 2 * 100
+    return [float(np.percentile(wers, tail)), float(np.percentile(wers, 100 - tail))]
+
+# Function to summarize a set of files with pooled (micro) metrics, averaged per file (macro) metrics and a WER interval
+def summarize_statistics(statistics_list: list[dict[str, Any]]) -> dict[str, Any]:
+    pooled = {}
+    for statistics in statistics_list:
+        merge_statistics(pooled, statistics)
+
+    # Average the rates of the files, counts are only meaningful pooled
+    file_metrics = [calc_statistics_metrics(statistics) for statistics in statistics_list]
+    rates = [key for key in file_metrics[0] if all(isinstance(metrics.get(key), float) for metrics in file_metrics)]
+    return {
+        "Files": len(statistics_list),
+        "N": pooled["N"],
+        "Micro": calc_statistics_metrics(pooled),
+        "Macro": {key: sum(metrics[key] for metrics in file_metrics) / len(file_metrics) for key in rates},
+        "WER Interval": calc_wer_interval(statistics_list)
+    }
+
+# Function to summarize the corpus and every group of files
+def summarize_corpus(file_statistics: list[tuple[str, dict[str, Any]]]) -> dict[str, Any]:
+    groups = {}
+    for filename, statistics in file_statistics:
+        groups.setdefault(get_group(filename), []).append(statistics)
+
+    return {
+        "Corpus": summarize_statistics([statistics for _, statistics in file_statistics]),
+        "Groups": {group: summarize_statistics(statistics_list) for group, statistics_list in sorted(groups.items())}
+    }
+
+# Function to print the corpus summary
+def print_corpus_summary(summary: dict[str, Any]) -> None:
+    for name, group_summary in [('Corpus', summary["Corpus"])] + list(summary["Groups"].items()):
+        lower, upper = group_summary["WER Interval"]
+        print(f'\n{name} ({group_summary["Files"]} files):')
+        print(f'- N: {group_summary["N"]}')
+        print(f'- WER: {round(group_summary["Micro"]["WER"], 4)} [{round(lower, 4)}, {round(upper, 4)}], File Average WER: {round(group_summary["Macro"]["WER"], 4)}')
+        print(f'- Micro f-score: {round(group_summary["Micro"]["Micro F-Score"], 4)}, Macro f-score: {round(group_summary["Micro"]["Macro F-Score"], 4)}')
+
+# Function to score a single transcript and audio text pair, with the word timings of the audio text when they are known
+def score_job(filename: str, transcript_text: str, audio_text: str, word_timings: dict[str, list] = None) -> tuple[str, int, dict[str, float], dict[str, Any]]:
+    with record_stages(TRACE_MEMORY) as recorder:
+        # compare the transcript and audio text
+        reference, recognized, N = prepare_job_texts(transcript_text, audio_text)
+        with stage('Statistics'):
+            statistics = calc_aligned_statistics(reference, recognized, N)
+        if CALC_CER:
+            with stage('CER'):
+                statistics.update(calc_character_statistics(transcript_text, audio_text))
+
+        # The timed words only line up with the aligned words when they normalize to the same words as the text
+        if word_timings:
+            with stage('Breakdowns'):
+                words, speakers, starts = get_timed_words(word_timings)
+                if words == [word for word in recognized if word != None]:
+                    statistics.update(calc_breakdown_statistics(reference, recognized, speakers, starts))
+                else:
+                    print(f'Warning: [The word timings of {filename} do not match its text, skipping the breakdowns]')
+        with stage('Metrics'):
+            data = calc_statistics_metrics(statistics, PER_WORD_METRICS)
+
+    # Keep the time and memory of every stage next to the metrics
+    data["Timing"] = recorder.get_record()
+    return filename, N, data, statistics
+
+# Function to unpack a job tuple for the process pool
+def score_job_tuple(job: tuple[str, str, str, dict[str, list]]) -> tuple[str, int, dict[str, float], dict[str, Any]]:
+    return score_job(*job)
+
+# Function to score a chunk of jobs in a worker process
+def score_job_chunk(jobs: list[tuple[str, str, str, dict[str, list]]]) -> list[tuple[str, int, dict[str, float], dict[str, Any]]]:
+    return [score_job(*job) for job in jobs]
+
+# Function to score all jobs, in parallel when more than one worker is used, keeping the input order
+def score_jobs(jobs: Iterable[tuple[str, str, str, dict[str, list]]], workers: int, chunk_size: int = None) -> Iterator[tuple[str, int, dict[str, float], dict[str, Any]]]:
+    if workers <= 1:
+        yield from map(score_job_tuple, jobs)
+        return
+
+    # Submit the jobs in chunks so small files don't pay the inter-process overhead one by one,
+    # only reading ahead a few chunks per worker so the texts of the corpus never all are in memory
+    jobs = iter(jobs)
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=set_alignment_settings, initargs=({**get_alignment_settings(), **{name: globals()[name] for name in INSTRUMENTATION_SETTINGS}},)) as executor:
+        while True:
+            chunk = list(itertools.islice(jobs, chunk_size or SCORE_CHUNK_SIZE))
+            if chunk:
+                pending.append(executor.submit(score_job_chunk, chunk))
+            if not pending:
+                break
+            if not chunk or len(pending) >= workers * SCORE_CHUNKS_PER_WORKER:
+                yield from pending.popleft().result()
+
+# Function to hash the filename, normalized texts and word timings of a job together with the alignment settings,
+# the filename is included so files with the same texts don't share a manifest entry
+def get_job_hash(filename: str, transcript_text: str, audio_text: str, word_timings: dict[str, list] = None) -> str:
+    digest = hashlib.sha256()
+    for part in (filename, ' '.join(preprocess_text(transcript_text)), ' '.join(preprocess_text(audio_text)), json.dumps(word_timings), json.dumps(get_alignment_settings(), sort_keys=True)):
+        digest.update(part.encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+# Function to load the manifest of previously scored jobs keyed by job hash
+def load_manifest(file_path: str = MANIFEST_PATH) -> dict[str, dict[str, Any]]:
+    if not os.path.exists(file_path):
+        return {}
+    return load_json(file_path)
+
+# Function to score the jobs whose texts changed since the last run, reusing the manifest for the others
+def score_changed_jobs(jobs: Iterable[tuple[str, str, str, dict[str, list]]], manifest: dict[str, dict[str, Any]], workers: int, chunk_size: int = None, force: bool = False) -> Iterator[tuple[str, int, dict[str, float], dict[str, Any], bool]]:
+    job_hashes = set()
+    order = deque()
+
+    # Hash the jobs as they are read, only the changed ones are passed on to be scored
+    def iter_changed_jobs() -> Iterator[tuple[str, str, str, dict[str, list]]]:
+        for job in jobs:
+            job_hash = get_job_hash(*job)
+            is_changed = force or 'statistics' not in manifest.get(job_hash, {})
+            job_hashes.add(job_hash)
+            order.append((job_hash, is_changed))
+            if is_changed:
+                yield job
+
+    # Score the changed jobs in the background while yielding every job in the input order
+    scored = score_jobs(iter_changed_jobs(), workers, chunk_size)
+    for filename, N, data, statistics in itertools.chain(scored, [(None, None, None, None)]):
+        # Yield the unchanged jobs read before the next scored job, or all remaining ones at the end
+        while order and (not order[0][1] or filename is None):
+            entry = manifest[order.popleft()[0]]
+            yield entry['filename'], entry['N'], entry['data'], entry['statistics'], False
+        if filename is None:
+            break
+
+        job_hash, _ = order.popleft()
+        manifest[job_hash] = {"filename": filename, "N": N, "data": data, "statistics": statistics}
+        yield filename, N, data, statistics, True
+
+    # Forget the jobs that no longer exist
+    for job_hash in set(manifest) - set(job_hashes):
+        del manifest[job_hash]
+
+# Function to stream the jobs of the transcript entries with a matching audio text, joined by filename in sorted order
+def iter_jobs(transcript_file_path: str, audio_file_path: str, word_timings_path: str = None) -> Iterator[tuple[str, str, str, dict[str, list]]]:
+    streams = [iter_sorted_entries(transcript_file_path), iter_sorted_entries(audio_file_path)]
+    if word_timings_path and os.path.exists(word_timings_path):
+        streams.append(iter_sorted_entries(word_timings_path))
+
+    for transcript_entry, audio_entry, *word_timings in join_sorted_entries(*streams):
+        filename = transcript_entry['filename']
+        if audio_entry is None:
             print(f"No matching entry in audio data for filename: {filename}\n")
+            continue
+        yield filename, transcript_entry['text'], audio_entry['text'], word_timings[0] if word_timings else None
+
+# Function to print the results of a single job
+def print_job_results(filename: str, N: int, data: dict[str, float], unchanged: bool = False) -> None:
+    print(f'\n{filename}{" (unchanged)" if unchanged else ""}:')
+    print(f'- N: {N}')
+    print(f'- WER: {round(data["WER"], 4)}')
+    print(f'- WRR: {round(data["WRR"], 4)}')
+    print(f'- WCR: {round(data["WCR"], 4)}')
+    print(f'- Micro Precision: {round(data["Micro Precision"], 4)}, Micro Recall: {round(data["Micro Recall"], 4)}')
+    print(f'- Macro Precision: {round(data["Macro Precision"], 4)}, Macro Recall: {round(data["Macro Recall"], 4)}')
+    print(f'- Micro f-score: {round(data["Micro F-Score"], 4)}, Macro f-score: {round(data["Macro F-Score"], 4)}')
+    if "Timing" in data:
+        print(f'- Time: {round(data["Timing"]["Total (Seconds)"], 4)} sec')
+    if "CER" in data:
+        print(f'- CER: {round(data["CER"], 4)}')
+    for breakdown in ("Speakers", "Windows"):
+        if breakdown in data:
+            print(f'- {breakdown} WER: ' + ', '.join(f'{key}: {"-" if metrics["WER"] is None else round(metrics["WER"], 4)}' for key, metrics in data[breakdown].items()))
+
+def main() -> None:
+    global USE_REFERENCE_LEVENSHTEIN, LINEAR_MEMORY_THRESHOLD, USE_BANDED_ALIGNMENT, BAND_MEMORY_BYTES, ANCHOR_NGRAM_LENGTH, PER_WORD_METRICS, GROUP_PATTERN, NORMALIZATION, CALC_CER, TIME_WINDOW_SECONDS, TRACE_MEMORY
+
+    # Parse the command line options
+    parser = argparse.ArgumentParser(description='Analyze the transcribed audio against the transcripts')
+    parser.add_argument('--reference-levenshtein', action='store_true', help='reproduce the original alignment heuristic on the levenshtein distance matrix, the only way to reproduce results from before the exact traceback')
+    parser.add_argument('--linear-memory-threshold', type=int, default=LINEAR_MEMORY_THRESHOLD, help='matrix size in cells above which the linear memory alignment is used')
+    parser.add_argument('--banded', action='store_true', help='align within a diagonal band as wide as the edit distance, falling back to the full alignment')
+    parser.add_argument('--band-memory-mb', type=float, default=BAND_MEMORY_BYTES / (1024 * 1024), help='memory the band may take before the banded alignment falls back to the linear memory mode')
+    parser.add_argument('--anchor-ngram', type=int, default=ANCHOR_NGRAM_LENGTH, help='split the alignment on unique exact matching n-grams of this length, 0 disables it')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='number of processes scoring files in parallel')
+    parser.add_argument('--chunk-size', type=int, default=None, help='number of files submitted to a worker at once')
+    parser.add_argument('--jsonl', action='store_true', help=f'append the results to {RESULTS_JSONL_PATH} as each file is scored instead of rewriting {RESULTS_PATH}')
+    parser.add_argument('--force', action='store_true', help='score every file, even when its texts did not change since the last run')
+    parser.add_argument('--per-word', action='store_true', help='include the precision and recall of every word in the results')
+    parser.add_argument('--unicode-punctuation', action='store_true', help='remove every unicode punctuation and symbol character instead of only ascii punctuation')
+    parser.add_argument('--casefold', action='store_true', help='casefold instead of lowercasing the text')
+    parser.add_argument('--normalize-numbers', action='store_true', help='spell out numbers in words')
+    parser.add_argument('--expand-contractions', action='store_true', help="expand contractions like don't to do not")
+    parser.add_argument('--lexicon', default=None, help='json object or tab separated file of word replacements')
+    parser.add_argument('--cer', action='store_true', help='also calculate the Character Error Rate')
+    parser.add_argument('--time-window', type=float, default=TIME_WINDOW_SECONDS, help=f'seconds per window of the WER breakdown over time, using the word timings in {WORD_TIMINGS_PATH}.jsonl')
+    parser.add_argument('--group-pattern', default=GROUP_PATTERN, help='regular expression matching the group prefix of a filename')
+    parser.add_argument('--trace-memory', action='store_true', help='record the peak memory of every stage with tracemalloc, slowing the scoring down')
+    parser.add_argument('--profile', action='store_true', help=f'score in a single process under cProfile, saving {PROFILE_PATH} and the stage flame graph stacks in {FOLDED_STACKS_PATH}')
+    parser.add_argument('--merge-statistics', nargs='+', metavar='FILE', help=f'only summarize the corpus from {STATISTICS_PATH} files of earlier runs')
+    args = parser.parse_args()
+    USE_REFERENCE_LEVENSHTEIN = args.reference_levenshtein
+    LINEAR_MEMORY_THRESHOLD = args.linear_memory_threshold
+    USE_BANDED_ALIGNMENT = args.banded
+    BAND_MEMORY_BYTES = int(args.band_memory_mb * 1024 * 1024)
+    ANCHOR_NGRAM_LENGTH = args.anchor_ngram
+    PER_WORD_METRICS = args.per_word
+    GROUP_PATTERN = args.group_pattern
+    CALC_CER = args.cer
+    TIME_WINDOW_SECONDS = args.time_window
+    TRACE_MEMORY = args.trace_memory
+    NORMALIZATION = {
+        "unicode_punctuation": args.unicode_punctuation,
+        "casefold": args.casefold,
+        "numbers": args.normalize_numbers,
+        "contractions": args.expand_contractions,
+        "lexicon": load_lexicon(args.lexicon) if args.lexicon else {}
+    }
+
+    # Only merge the statistics of earlier runs, for example of shards scored on other machines
+    if args.merge_statistics:
+        file_statistics = [(entry['filename'], entry['statistics']) for file_path in args.merge_statistics for entry in load_json(file_path)]
+        print_corpus_summary(summarize_corpus(file_statistics))
+        return
+
+    # Stream the transcript entries joined with their audio text, without loading the outputs in memory
+    jobs = iter_jobs(find_build_file(TRANSCRIPT_OUTPUT_PATH), find_build_file(AUDIO_OUTPUT_PATH), find_build_file(WORD_TIMINGS_PATH))
+
+    # Score the changed jobs, either streaming the results or saving all of them at once
+    manifest = load_manifest()
+    results = {} if args.jsonl else load_results()
+    file_statistics = []
+    stage_seconds = {}
+
+    # The profiler only sees the current process, so the profile mode scores without workers
+    try:
+        with profile(PROFILE_PATH) if args.profile else contextlib.nullcontext():
+            for filename, N, data, statistics, changed in score_changed_jobs(jobs, manifest, 1 if args.profile else args.workers, args.chunk_size, args.force):
+                print_job_results(filename, N, data, unchanged=not changed)
+                file_statistics.append((filename, statistics))
+                if changed:
+                    merge_stage_seconds(stage_seconds, data["Timing"])
+                if args.jsonl:
+                    if changed:
+                        append_results_line(filename, data)
+                else:
+                    update_results(results, filename, data)
+    except BaseException:
+        # Keep the results of the files scored before the failure
+        if not args.jsonl:
+            save_results(results)
+        raise
+    finally:
+        # The manifest holds every scored file, so the next run doesn't score them again
+        save_json_atomic(MANIFEST_PATH, manifest)
+    if args.profile:
+        save_folded_stacks(FOLDED_STACKS_PATH, stage_seconds)
+
+    # Keep the statistics so shards can be merged later
+    save_json_atomic(STATISTICS_PATH, [{"filename": filename, "statistics": statistics} for filename, statistics in file_statistics])
+    if not file_statistics:
+        return
+
+    # Summarize the corpus, stored in the summary entry without a filename
+    summary = summarize_corpus(file_statistics)
+    print_corpus_summary(summary)
+    if args.jsonl:
+        append_results_line(None, summary)
+    else:
+        update_results(results, None, summary)
+        save_results(results)
 
 if __name__ == "__main__":
     main()
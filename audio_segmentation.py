@@ -0,0 +1,87 @@
+import os
+import re
+import shutil
+import subprocess
+
+# Volume below which audio counts as silence, and how long it has to last to be a place to cut
+SILENCE_THRESHOLD_DB = -30
+MIN_SILENCE_SECONDS = 0.5
+
+# Shortest segment worth a job of its own, a shorter tail is merged into the segment before it
+MIN_SEGMENT_SECONDS = 1.0
+
+# Silence boundaries reported by the ffmpeg silencedetect filter
+SILENCE_START_PATTERN = re.compile(r'silence_start: (-?[\d.]+)')
+SILENCE_END_PATTERN = re.compile(r'silence_end: (-?[\d.]+)')
+
+# Function to check whether audio can be segmented locally
+def can_segment() -> bool:
+    return shutil.which('ffmpeg') is not None
+
+# Function to detect the silent stretches of an audio file with ffmpeg
+def detect_silences(path: str, threshold_db: float = SILENCE_THRESHOLD_DB, min_seconds: float = MIN_SILENCE_SECONDS) -> list[tuple[float, float]]:
+    output = subprocess.run(['ffmpeg', '-hide_banner', '-nostats', '-i', path, '-af', f'silencedetect=noise={threshold_db}dB:d={min_seconds}', '-f', 'null', '-'], capture_output=True, check=True, text=True).stderr
+
+    # The filter logs the start and end of every silence, a silence running to the end of the file has no end
+    silences = []
+    start = None
+    for line in output.splitlines():
+        match = SILENCE_START_PATTERN.search(line)
+        if match:
+            start = max(0.0, float(match.group(1)))
+            continue
+        match = SILENCE_END_PATTERN.search(line)
+        if match and start is not None:
+            silences.append((start, float(match.group(1))))
+            start = None
+    return silences
+
+# Function to plan segments of at most max_seconds, cutting in the middle of the last silence before the limit
+def plan_segments(duration: float, silences: list[tuple[float, float]], max_seconds: float) -> list[tuple[float, float]]:
+    cuts = [(start + end) / 2 for start, end in silences]
+    segments = []
+    start = 0.0
+    while duration - start > max_seconds:
+        limit = start + max_seconds
+        candidates = [cut for cut in cuts if start + MIN_SEGMENT_SECONDS <= cut <= limit]
+
+        # Cut through speech only when there is no silence to cut at
+        cut = candidates[-1] if candidates else limit
+        segments.append((start, cut))
+        start = cut
+
+    # The merged tail overruns the limit by less than the shortest segment
+    if segments and duration - start < MIN_SEGMENT_SECONDS:
+        segments[-1] = (segments[-1][0], duration)
+    else:
+        segments.append((start, duration))
+    return segments
+
+# Function to write every segment of an audio file to its own flac file in the directory
+def split_audio(path: str, segments: list[tuple[float, float]], directory: str) -> list[str]:
+    name = os.path.splitext(os.path.basename(path))[0]
+    segment_paths = []
+    for index, (start, end) in enumerate(segments):
+        segment_path = os.path.join(directory, f'{name}.{index:04d}.flac')
+
+        # Seeking before the input is exact because the audio is decoded again
+        subprocess.run(['ffmpeg', '-v', 'error', '-y', '-ss', f'{start:.3f}', '-t', f'{end - start:.3f}', '-i', path, '-vn', '-c:a', 'flac', segment_path], check=True)
+        segment_paths.append(segment_path)
+    return segment_paths
+
+# Function to stitch the transcripts of consecutive segments, shifting the timestamps by the start of their segment
+def stitch_transcripts(transcripts: list[any], offsets: list[float]) -> dict[str, any]:
+    monologues = []
+    for index, (transcript, offset) in enumerate(zip(transcripts, offsets)):
+        for monologue in transcript['monologues']:
+            elements = []
+            for element in monologue['elements']:
+                element = dict(element)
+                for key in ('ts', 'end_ts'):
+                    if element.get(key) is not None:
+                        element[key] = round(element[key] + offset, 3)
+                elements.append(element)
+
+            # Speaker labels are assigned per job, so they are prefixed with the segment they identify speakers in
+            monologues.append({**monologue, "speaker": f'{index}:{monologue.get("speaker", 0)}', "elements": elements})
+    return {"monologues": monologues}
@@ -0,0 +1,149 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+import numpy as np
+from typing import Any, Callable
+import analyze_build
+
+# Alignment modes that can be benchmarked, as the analyze_build settings they need
+MODES = {
+    "full": {},
+    "reference": {"USE_REFERENCE_LEVENSHTEIN": True},
+    "linear": {"LINEAR_MEMORY_THRESHOLD": 0},
+    "banded": {"USE_BANDED_ALIGNMENT": True},
+    "anchored": {"ANCHOR_NGRAM_LENGTH": 6}
+}
+
+# Function to generate a synthetic reference text and a hypothesis with the requested error rate and mix
+def generate_texts(size: int, wer: float, insertion_share: float, deletion_share: float, vocabulary_size: int = 5000, seed: int = 0) -> tuple[str, str]:
+    rng = random.Random(seed)
+
+    # Zipf-like word frequencies, like in natural speech
+    vocabulary = [f'w{index}' for index in range(vocabulary_size)]
+    weights = [1 / (rank + 1) for rank in range(vocabulary_size)]
+    reference = rng.choices(vocabulary, weights, k=size)
+
+    hypothesis = []
+    for word in reference:
+        if rng.random() >= wer:
+            hypothesis.append(word)
+            continue
+
+        # Pick the kind of error from the requested mix, the rest are substitutions
+        kind = rng.random()
+        if kind < insertion_share:
+            hypothesis.extend([word, rng.choice(vocabulary)])
+        elif kind < insertion_share + deletion_share:
+            continue
+        else:
+            hypothesis.append(rng.choice(vocabulary))
+
+    return ' '.join(reference), ' '.join(hypothesis)
+
+# Function to time a function over several repeats, returning the median seconds and the last result
+def time_function(function: Callable[[], Any], repeat: int) -> tuple[float, Any]:
+    durations = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result = function()
+        durations.append(time.perf_counter() - start_time)
+    return statistics.median(durations), result
+
+# Function to measure the peak traced memory of a function
+def measure_peak_memory(function: Callable[[], Any]) -> int:
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+# Function to benchmark the alignment and the metric stage of one mode and size
+def benchmark_case(mode: str, size: int, args: argparse.Namespace) -> dict[str, Any]:
+    analyze_build.set_alignment_settings({**analyze_build.DEFAULT_ALIGNMENT_SETTINGS, **MODES[mode]})
+    transcript_text, audio_text = generate_texts(size, args.wer, args.insertion_share, args.deletion_share, seed=args.seed)
+
+    prepare_seconds, (reference, recognized, N) = time_function(lambda: analyze_build.prepare_job_texts(transcript_text, audio_text), args.repeat)
+    metrics_seconds, metrics = time_function(lambda: analyze_build.calc_aligned_metrics(reference, recognized, N), args.repeat)
+
+    return {
+        "mode": mode,
+        "size": size,
+        "wer": metrics["WER"],
+        "prepare_seconds": prepare_seconds,
+        "metrics_seconds": metrics_seconds,
+        "prepare_peak_bytes": measure_peak_memory(lambda: analyze_build.prepare_job_texts(transcript_text, audio_text)),
+        "metrics_peak_bytes": measure_peak_memory(lambda: analyze_build.calc_aligned_metrics(reference, recognized, N))
+    }
+
+# Function to run every benchmark case and save the records
+def run_benchmarks(args: argparse.Namespace) -> None:
+    records = []
+    for mode in args.modes:
+        for size in args.sizes:
+            record = benchmark_case(mode, size, args)
+            records.append(record)
+            print(f'{mode:>9} {size:>7} words: prepare {record["prepare_seconds"]:.4f} sec, {record["prepare_peak_bytes"] / 2 ** 20:.1f} MB, metrics {record["metrics_seconds"]:.4f} sec, {record["metrics_peak_bytes"] / 2 ** 20:.1f} MB')
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as file:
+        json.dump({
+            "created": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "settings": {"wer": args.wer, "insertion_share": args.insertion_share, "deletion_share": args.deletion_share, "repeat": args.repeat, "seed": args.seed},
+            "records": records
+        }, file, indent=2)
+
+# Function to compare two benchmark runs, returns the number of regressions
+def compare_benchmarks(baseline_path: str, candidate_path: str, threshold: float) -> int:
+    with open(baseline_path, 'r') as file:
+        baseline = {(record['mode'], record['size']): record for record in json.load(file)['records']}
+    with open(candidate_path, 'r') as file:
+        candidate = {(record['mode'], record['size']): record for record in json.load(file)['records']}
+
+    regressions = 0
+    for key in sorted(baseline.keys() & candidate.keys()):
+        for measurement in ('prepare_seconds', 'metrics_seconds', 'prepare_peak_bytes', 'metrics_peak_bytes'):
+            old, new = baseline[key][measurement], candidate[key][measurement]
+            ratio = new / old if old else 1.0
+            flag = ''
+            if ratio > 1 + threshold:
+                flag = ' REGRESSION'
+                regressions += 1
+            print(f'{key[0]:>9} {key[1]:>7} {measurement:<20} {old:>14.4f} -> {new:>14.4f} ({ratio:.2f}x){flag}')
+    return regressions
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark the alignment and scoring on synthetic transcripts')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='run the benchmarks and save the records')
+    run_parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000], help='numbers of reference words')
+    run_parser.add_argument('--modes', nargs='+', choices=list(MODES), default=['full'], help='alignment modes to benchmark')
+    run_parser.add_argument('--wer', type=float, default=0.1, help='fraction of reference words with an error')
+    run_parser.add_argument('--insertion-share', type=float, default=1 / 3, help='share of the errors that are insertions')
+    run_parser.add_argument('--deletion-share', type=float, default=1 / 3, help='share of the errors that are deletions')
+    run_parser.add_argument('--repeat', type=int, default=3, help='number of timed repeats, the median is recorded')
+    run_parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic transcripts')
+    run_parser.add_argument('--output', default='build/benchmark.json', help='file the records are saved to')
+
+    compare_parser = subparsers.add_parser('compare', help='compare two saved runs and flag regressions')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+    compare_parser.add_argument('--threshold', type=float, default=0.1, help='relative slowdown or memory growth flagged as a regression')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run_benchmarks(args)
+    elif compare_benchmarks(args.baseline, args.candidate, args.threshold):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import contextlib
+import heapq
+import itertools
+import json
+import os
+import tempfile
+from operator import itemgetter
+from typing import Iterable, Iterator
+
+# Number of characters read at once from a json array file, doubled while an entry doesn't fit
+READ_SIZE = 1 << 20
+
+# Number of entries sorted in memory at once, larger inputs are sorted in runs on disk and merged
+SORT_RUN_SIZE = 10000
+
+# Function to stream the entries of a json array file without loading the whole file
+def iter_json_array(file) -> Iterator[dict[str, any]]:
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    read_size = READ_SIZE
+    eof = False
+    started = False
+
+    while True:
+        # Skip the whitespace, the opening bracket and the separators between the entries
+        while position < len(buffer) and (buffer[position] in ' \t\r\n,' or (buffer[position] == '[' and not started)):
+            started = started or buffer[position] == '['
+            position += 1
+
+        if position < len(buffer):
+            if buffer[position] == ']':
+                return
+            try:
+                entry, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # The entry is incomplete, read more of the file at once the next time
+                entry = None
+                read_size *= 2
+            if entry is not None:
+                read_size = READ_SIZE
+                yield entry
+                continue
+        elif eof:
+            return
+
+        chunk = file.read(read_size)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+# Function to stream the entries of a build file, either json lines or the original json array
+def iter_json_entries(file_path: str) -> Iterator[dict[str, any]]:
+    with open(file_path, 'r') as file:
+        # A json array starts with a bracket, a json lines file with an object
+        first_character = ''
+        while not first_character.strip():
+            first_character = file.read(1)
+            if not first_character:
+                return
+        file.seek(0)
+
+        if first_character == '[':
+            yield from iter_json_array(file)
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+# Function to write entries as json lines, through a temporary file so readers never see a partial file
+def write_json_lines(file_path: str, entries: Iterable[dict[str, any]]) -> None:
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(file_path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as file:
+            for entry in entries:
+                file.write(json.dumps(entry, separators=(',', ':')) + '\n')
+        os.replace(temp_path, file_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+# Function to save json through a temporary file so readers never see a partial file
+def save_json_atomic(file_path: str, data: any) -> None:
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(file_path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as file:
+            json.dump(data, file, indent=2)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+# Function to find a build file, preferring the json lines file unless the original json file is newer
+def find_build_file(base_path: str) -> str:
+    candidates = [path for path in (base_path + '.jsonl', base_path + '.json') if os.path.exists(path)]
+    return max(candidates, key=os.path.getmtime) if candidates else base_path + '.jsonl'
+
+# Function to sort entries by a key in bounded memory, keeping the input order of equal keys
+def sort_entries(entries: Iterable[dict[str, any]], key: str = 'filename', run_size: int = SORT_RUN_SIZE) -> Iterator[dict[str, any]]:
+    with tempfile.TemporaryDirectory() as directory, contextlib.ExitStack() as stack:
+        run_paths = []
+        entries = iter(entries)
+        while True:
+            run = sorted(itertools.islice(entries, run_size), key=itemgetter(key))
+
+            # Inputs that fit in a single run never touch the disk
+            if len(run) < run_size and not run_paths:
+                yield from run
+                return
+            if not run:
+                break
+            run_paths.append(os.path.join(directory, f'{len(run_paths)}.jsonl'))
+            write_json_lines(run_paths[-1], run)
+
+        # Merge the sorted runs, earlier runs win ties so the order stays stable
+        runs = [map(json.loads, stack.enter_context(open(run_path, 'r'))) for run_path in run_paths]
+        yield from heapq.merge(*runs, key=itemgetter(key))
+
+# Function to check whether the entries of a build file are sorted by a key
+def is_sorted(file_path: str, key: str = 'filename') -> bool:
+    previous = None
+    for entry in iter_json_entries(file_path):
+        if previous is not None and entry[key] < previous:
+            return False
+        previous = entry[key]
+    return True
+
+# Function to stream the entries of a build file sorted by a key, only sorting when the file isn't sorted yet
+def iter_sorted_entries(file_path: str, key: str = 'filename') -> Iterator[dict[str, any]]:
+    if is_sorted(file_path, key):
+        return iter_json_entries(file_path)
+    return sort_entries(iter_json_entries(file_path), key)
+
+# Function to join streams sorted by a key, yielding every left entry with the matching entry of every right stream or None
+def join_sorted_entries(left: Iterable[dict[str, any]], *rights: Iterable[dict[str, any]], key: str = 'filename') -> Iterator[tuple[dict[str, any], ...]]:
+    rights = [iter(right) for right in rights]
+    currents = [next(right, None) for right in rights]
+    for entry in left:
+        matches = []
+        for index, right in enumerate(rights):
+            # Skip the right entries without a left entry, a matching entry is kept for the next left entry with the same key
+            while currents[index] is not None and currents[index][key] < entry[key]:
+                currents[index] = next(right, None)
+            matches.append(currents[index] if currents[index] is not None and currents[index][key] == entry[key] else None)
+        yield (entry, *matches)
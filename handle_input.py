@@ -1,101 +1,475 @@
+import argparse
+import contextlib
+import hashlib
+import itertools
 import os
-import sys
+import subprocess
+import tempfile
+import textwrap
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
-from rev_ai import apiclient, JobStatus
+from rev_ai import apiclient
+from job_waiting import CallbackListener, JobFailedError, JobWaiter, PollRateLimiter
+from transcript_cache import TranscriptCache
+from job_timing import add_real_time_factors, get_audio_duration, get_server_processing_time, summarize_timings
+from audio_segmentation import can_segment, detect_silences, plan_segments, split_audio, stitch_transcripts
+from build_files import iter_json_entries, save_json_atomic, sort_entries, write_json_lines
+from transcribers import LOCAL_BATCH_SIZE, FixtureTranscriber, RevAiTranscriber, Transcriber, VoskTranscriber
 import json
 import time
+from operator import itemgetter
+from typing import Iterable, Iterator
 
-# Get the API key
-load_dotenv()
-api_key = os.environ.get("API_KEY")
+# Maximum number of audio files being transcribed at the same time
+MAX_IN_FLIGHT_JOBS = 8
 
-# create your client
-client = apiclient.RevAiAPIClient(api_key)
+# Maximum number of job status requests per second, shared by all jobs
+POLLS_PER_SECOND = 2.0
 
-# Function to process an audio file and get the job id
-def process_audio_file(path: str) -> any:
-    # send a local file
-    job = client.submit_job_local_file(path)
+# Options passed on when submitting a job, part of the transcript cache key
+TRANSCRIPTION_OPTIONS = {}
 
-    # check job status
-    while(True):
-        if(client.get_job_details(job.id).status != JobStatus.IN_PROGRESS):
-            break
+# Parsed transcript files, reused while a transcript file doesn't change
+TRANSCRIPT_MANIFEST_PATH = os.path.join('build', 'transcript_manifest.json')
+
+# Directory of the parsed entries of every transcript file, one json lines file per file contents
+TRANSCRIPT_ENTRIES_DIRECTORY = os.path.join('build', 'transcripts')
+
+# Which transcript file wins when an audio file appears in several: first, last or all
+TRANSCRIPT_CONFLICT_POLICY = 'last'
+
+# Audio longer than this many seconds is split at silences and its segments are transcribed concurrently, 0 disables it
+SEGMENT_SECONDS = 0
+
+# Number of times a segment is submitted before its audio file is given up on
+SEGMENT_ATTEMPTS = 2
+
+# Format of the audio and transcript outputs, json lines are streamed by the analysis, json is the original format
+OUTPUT_FORMAT = 'jsonl'
+
+# Location and size limit of the transcript cache
+CACHE_DIRECTORY = os.path.join('build', 'cache')
+CACHE_SIZE_MB = 1024
+
+# Function to create the client with the API key from the environment
+def create_client() -> apiclient.RevAiAPIClient:
+    load_dotenv()
+    return apiclient.RevAiAPIClient(os.environ.get("API_KEY"))
+
+# Function to create the transcriber backend, Rev.ai unless a local backend is selected
+def create_transcriber(backend: str = 'revai', fixture_dir: str = None, vosk_model: str = None, batch_size: int = LOCAL_BATCH_SIZE) -> Transcriber:
+    if backend == 'fixture':
+        return FixtureTranscriber(fixture_dir, batch_size)
+    if backend == 'vosk':
+        return VoskTranscriber(vosk_model, batch_size)
+    return RevAiTranscriber(create_client())
+
+# Function to process an audio file and get the job id, recording the upload, processing and polling times
+# The job holds one of the shared slots from its submission until it finishes, so files and segments share the in-flight limit
+def process_audio_file(transcriber: Transcriber, path: str, waiter: JobWaiter = None, timing: dict[str, float] = None, slots: threading.Semaphore = None) -> any:
+    waiter = waiter or JobWaiter()
+    timing = {} if timing is None else timing
+
+    with slots or contextlib.nullcontext():
+        # send a local file
+        start_time = time.perf_counter()
+        job_id = transcriber.submit(path, waiter.callback_url, TRANSCRIPTION_OPTIONS)
+        timing['Upload (Seconds)'] = time.perf_counter() - start_time
+
+        # wait for the job to finish, raises when it failed
+        start_time = time.perf_counter()
+        job_details = transcriber.wait(job_id, waiter, timing)
+        timing['Waiting (Seconds)'] = time.perf_counter() - start_time
+
+    # The server reports how long it actually worked on the job, the rest of the wait is polling overhead
+    processing_time = get_server_processing_time(job_details)
+    if processing_time is not None:
+        timing['Processing (Seconds)'] = processing_time
+        timing['Polling Overhead (Seconds)'] = max(0.0, timing['Waiting (Seconds)'] - processing_time)
+    if getattr(job_details, 'duration_seconds', None) and not timing.get('Audio Duration (Seconds)'):
+        timing['Audio Duration (Seconds)'] = job_details.duration_seconds
 
     # return the job id
-    return job.id
+    return job_id
 
 # Function to extract and concatenate values labeled as 'text' and 'punct'
 def get_text_from_json(json_data: any) -> str:
     result_string = ""
     for monologue in json_data['monologues']:
+        # A monologue ends on its punctuation without a space, keep the last word apart from the next monologue
+        if result_string and not result_string[-1].isspace():
+            result_string += ' '
         for element in monologue['elements']:
             if element['type'] in ('text', 'punct'):
                 result_string += element['value']
     return result_string
 
-# Function to process a job by retrieving transcript JSON using the client and extracting relevant information.
-def process_job(filename: str, job_id: any) -> dict[str, str]:
-    # Retrieve transcript JSON for the given job_id using the client
-    json = client.get_transcript_json(job_id)
-    
+# Function to extract the words with their speaker, timestamps and confidence, stored as compact columns
+def get_word_timings_from_json(json_data: any) -> dict[str, list]:
+    word_timings = {"words": [], "speakers": [], "start": [], "end": [], "confidence": []}
+    for monologue in json_data['monologues']:
+        for element in monologue['elements']:
+            if element['type'] == 'text':
+                word_timings['words'].append(element['value'])
+                word_timings['speakers'].append(monologue.get('speaker', 0))
+                word_timings['start'].append(element.get('ts'))
+                word_timings['end'].append(element.get('end_ts'))
+                word_timings['confidence'].append(element.get('confidence'))
+    return word_timings
+
+# Function to process a job by retrieving transcript JSON using the transcriber and extracting relevant information.
+def process_job(transcriber: Transcriber, filename: str, job_id: any, cache: TranscriptCache = None, cache_key: str = None, timing: dict[str, float] = None) -> dict[str, any]:
+    # Retrieve transcript JSON for the given job_id using the transcriber
+    start_time = time.perf_counter()
+    json = transcriber.get_transcript_json(job_id)
+    if timing is not None:
+        timing['Download (Seconds)'] = time.perf_counter() - start_time
+
+    # Store the raw transcript so the same audio doesn't have to be transcribed again
+    if cache and cache_key:
+        cache.put(cache_key, json)
+
     # Return a dictionary containing information for the current job, including the filename and extracted text
-    return {"filename": filename, "text": get_text_from_json(json)}
+    return create_dialogue(filename, json)
 
-# Function to save data in a json file
-def save_data_as_json(output_path: str, data: list[dict[str, str]]) -> None:
-    # Convert the data list to a JSON string
-    json_data = json.dumps(data, indent=2)
+# Function to create the dialogue dictionary of a transcript, keeping the word timings so they don't have to be fetched again
+def create_dialogue(filename: str, json_data: any) -> dict[str, any]:
+    return {"filename": filename, "text": get_text_from_json(json_data), "timings": get_word_timings_from_json(json_data)}
 
-    # Save the JSON string to a file
+# Function to save data in a json file, compact writes every entry on a single line without spaces
+def save_data_as_json(output_path: str, data: Iterable[dict[str, str]], compact: bool = False) -> None:
+    # Write the entries one at a time, formatted like json.dumps(data, indent=2)
     with open(output_path, 'w') as output_file:
-        output_file.write(json_data)
+        output_file.write('[')
+        separator = '\n'
+        for entry in data:
+            if compact:
+                output_file.write(separator + json.dumps(entry, separators=(',', ':')))
+            else:
+                output_file.write(separator + textwrap.indent(json.dumps(entry, indent=2), '  '))
+            separator = ',\n'
+        output_file.write(']' if separator == '\n' else '\n]')
 
-# Function to convert the transcript file to JSON
-def convert_transcript_to_json(input_path: str, output_path: str, audio_filenames: list[str]) -> None:
+# Function to save a build file, as json lines when the path ends in .jsonl and as a json array otherwise
+def save_build_file(output_path: str, data: Iterable[dict[str, any]], compact: bool = False) -> None:
+    if output_path.endswith('.jsonl'):
+        write_json_lines(output_path, data)
+    else:
+        save_data_as_json(output_path, data, compact)
+
+# Function to stream the (name, text) dialogues of a transcript file, dialogues are separated by blank lines
+def iter_transcript_dialogues(input_path: str) -> Iterator[tuple[str, str]]:
     with open(input_path, 'r') as input_file:
-        input_text = input_file.read()
+        lines = []
+        for line in itertools.chain(input_file, ['']):
+            if line.strip() != "":
+                lines.append(line)
+                continue
+            if not lines:
+                continue
 
-    # Split the input text into lines
-    lines = input_text.split('\n')
+            # Appends lines in a dialogue
+            cleaned_string = ' '.join(' '.join(lines).split())
+            lines = []
 
-    # Process each line and create the JSON structure
-    stringBuilder = ""
-    data = []
-    for line in lines:
-        if(line == "" and stringBuilder != ""):
-            try:
-                # Appends lines in a dialogue
-                cleaned_string = ' '.join(stringBuilder.split())
+            # Split the cleaned string into filename and text
+            if ':' not in cleaned_string:
+                print("Error: Unable save dialogue")
+                continue
+            name, text = cleaned_string.split(':', 1)
 
-                # Split the cleaned string into filename and text
-                name, text = cleaned_string.split(':', 1)
+            # Remove trailing spaces from text
+            yield name, text.strip()
 
-                # Remove trailing spaces from text
-                text = text.strip()
+# Index of the audio filenames by their trigrams, to find the filenames containing a name without scanning them all
+class FilenameIndex:
+    def __init__(self, filenames: list[str]):
+        self.filenames = filenames
+        self.lowercase_filenames = [filename.lower() for filename in filenames]
+        self.trigrams = {}
+        for index, filename in enumerate(self.lowercase_filenames):
+            for start in range(len(filename) - 2):
+                self.trigrams.setdefault(filename[start:start + 3], set()).add(index)
+        self.matches = {}
 
-                # Add dialogue for every matching audio file
-                for audio_filename in audio_filenames:
-                    if name.lower() in audio_filename.lower():
-                        # Create a dictionary for the current dialogue
-                        dialogue = {"filename": audio_filename, "text": text}
+    # Function to get the filenames containing a name, in the order of the filenames
+    def find(self, name: str) -> list[str]:
+        name = name.lower()
+        if name not in self.matches:
+            # Only the filenames sharing every trigram of the name can contain it
+            if len(name) < 3:
+                candidates = range(len(self.filenames))
+            else:
+                postings = sorted((self.trigrams.get(name[start:start + 3], set()) for start in range(len(name) - 2)), key=len)
+                candidates = sorted(set.intersection(*postings))
+            self.matches[name] = [self.filenames[index] for index in candidates if name in self.lowercase_filenames[index]]
+        return self.matches[name]
 
-                        # Add the dialogue dictionary to the data list
-                        data.append(dialogue)
+# Function to stream the dialogues of a transcript file for every matching audio file
+def iter_transcript_entries(input_path: str, audio_filenames: list[str]) -> Iterator[dict[str, str]]:
+    filename_index = FilenameIndex(audio_filenames)
+    for name, text in iter_transcript_dialogues(input_path):
+        # Add dialogue for every matching audio file
+        for audio_filename in filename_index.find(name):
+            yield {"filename": audio_filename, "text": text}
 
-                # Reset the string builder
-                stringBuilder = ""
-            except:
-                print("Error: Unable save dialogue")
-        else:
-            stringBuilder += line + '\n'
+# Function to parse a transcript file into a json lines file of its dialogue entries, run in the worker processes
+def parse_transcript_file(input_path: str, audio_filenames: list[str], entries_path: str) -> None:
+    write_json_lines(entries_path, iter_transcript_entries(input_path, audio_filenames))
 
-    # Save the output in a .json file
-    save_data_as_json(output_path, data)
+# Function to hash the contents of a file
+def get_file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# Function to parse the transcript files that changed since the last run, returns the path of the entries file of every transcript file
+def parse_transcript_files(input_paths: list[str], audio_filenames: list[str], manifest_path: str = TRANSCRIPT_MANIFEST_PATH, entries_directory: str = TRANSCRIPT_ENTRIES_DIRECTORY, workers: int = None) -> dict[str, str]:
+    try:
+        with open(manifest_path, 'r') as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        manifest = {}
+    os.makedirs(entries_directory, exist_ok=True)
+
+    # The matched entries also depend on the audio filenames
+    audio_key = hashlib.sha256('\n'.join(audio_filenames).encode()).hexdigest()
+
+    # Find the transcript files whose size, modification time and then contents changed
+    changed_paths = []
+    for input_path in input_paths:
+        stat = os.stat(input_path)
+        record = manifest.get(input_path)
+        file_hash = None
+
+        if record and os.path.exists(record['entries']) and record['audio'] == audio_key and record['size'] == stat.st_size:
+            if record['mtime'] == stat.st_mtime_ns:
+                continue
+            file_hash = get_file_hash(input_path)
+            if record['hash'] == file_hash:
+                record['mtime'] = stat.st_mtime_ns
+                continue
+
+        # The entries file is named after the contents, so a renamed or restored file is not parsed again
+        file_hash = file_hash or get_file_hash(input_path)
+        entries_path = os.path.join(entries_directory, hashlib.sha256((file_hash + audio_key).encode()).hexdigest() + '.jsonl')
+        manifest[input_path] = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "hash": file_hash, "audio": audio_key, "entries": entries_path}
+        if not os.path.exists(entries_path):
+            changed_paths.append(input_path)
+
+    # Parse the changed files in parallel, the workers write the entries files themselves
+    if changed_paths:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            entries_paths = [manifest[input_path]['entries'] for input_path in changed_paths]
+            for input_path, _ in zip(changed_paths, executor.map(parse_transcript_file, changed_paths, itertools.repeat(audio_filenames), entries_paths)):
+                print(f'Success: [Parsed {input_path}]')
+
+    # Forget the transcript files that no longer exist along with their entries files, and save the manifest
+    manifest = {input_path: manifest[input_path] for input_path in input_paths}
+    used_paths = {os.path.abspath(record['entries']) for record in manifest.values()}
+    for filename in os.listdir(entries_directory):
+        if filename.endswith('.jsonl') and os.path.abspath(os.path.join(entries_directory, filename)) not in used_paths:
+            os.remove(os.path.join(entries_directory, filename))
+    save_json_atomic(manifest_path, manifest)
+
+    return {input_path: manifest[input_path]['entries'] for input_path in input_paths}
+
+# Function to stream the entries of every transcript file in sorted path order, tagged with the transcript file they came from
+def iter_source_entries(entries_paths: dict[str, str]) -> Iterator[dict[str, str]]:
+    for input_path in sorted(entries_paths):
+        for entry in iter_json_entries(entries_paths[input_path]):
+            yield {**entry, "source": input_path}
+
+# Function to merge the entries of every transcript file sorted by audio filename, resolving audio files that appear in several transcript files
+def merge_transcript_entries(entries_paths: dict[str, str], policy: str = TRANSCRIPT_CONFLICT_POLICY) -> Iterator[dict[str, str]]:
+    # The sort is stable, so the entries of an audio file stay in transcript file order
+    for filename, group in itertools.groupby(sort_entries(iter_source_entries(entries_paths)), key=itemgetter('filename')):
+        group = list(group)
+        sources = list(dict.fromkeys(entry['source'] for entry in group))
+        if len(sources) > 1:
+            print(f'Warning: [{filename} appears in {", ".join(sources)}, keeping {policy}]')
+            if policy == 'first':
+                sources = sources[:1]
+            elif policy == 'last':
+                sources = sources[-1:]
+
+        # Drop the dialogues that are exact duplicates
+        texts = set()
+        for entry in group:
+            if entry['source'] in sources and entry['text'] not in texts:
+                texts.add(entry['text'])
+                yield {key: value for key, value in entry.items() if key != 'source'}
+
+# Function to convert every transcript file into a single JSON or JSON lines file, sorted by audio filename
+def convert_transcripts_to_json(input_paths: list[str], output_path: str, audio_filenames: list[str], policy: str = TRANSCRIPT_CONFLICT_POLICY, workers: int = None) -> None:
+    entries_paths = parse_transcript_files(input_paths, audio_filenames, workers=workers)
+    save_build_file(output_path, merge_transcript_entries(entries_paths, policy))
+
+# Function to get the cache key of an audio file, None without a cache, the transcriber options can depend on the file
+def get_cache_key(transcriber: Transcriber, cache: TranscriptCache, path: str, segment_seconds: float = 0) -> str:
+    if not cache:
+        return None
+    options = {**TRANSCRIPTION_OPTIONS, **transcriber.get_cache_options(path)}
+    if segment_seconds:
+        options["segment_seconds"] = segment_seconds
+    return cache.get_key(path, options)
+
+# Function to transcribe a single segment, reusing the transcript of a segment that finished in an earlier run
+def transcribe_segment(transcriber: Transcriber, path: str, waiter: JobWaiter = None, cache: TranscriptCache = None, timing: dict[str, float] = None, slots: threading.Semaphore = None) -> any:
+    cache_key = get_cache_key(transcriber, cache, path)
+    cached_json = cache.get(cache_key) if cache else None
+    if cached_json is not None:
+        return cached_json
+
+    # Submit a failed segment again, so a single failure doesn't lose the whole recording
+    for attempt in range(SEGMENT_ATTEMPTS):
+        try:
+            job_id = process_audio_file(transcriber, path, waiter, timing, slots)
+            break
+        except (JobFailedError, TimeoutError) as error:
+            if attempt + 1 == SEGMENT_ATTEMPTS:
+                raise
+            print(f'Error: [{error}, submitting {os.path.basename(path)} again]')
+
+    start_time = time.perf_counter()
+    json_data = transcriber.get_transcript_json(job_id)
+    if timing is not None:
+        timing['Download (Seconds)'] = time.perf_counter() - start_time
+    if cache:
+        cache.put(cache_key, json_data)
+    return json_data
+
+# Function to transcribe long audio in segments split at silences, returning the stitched transcript json
+def transcribe_segments(transcriber: Transcriber, path: str, duration: float, segment_seconds: float, max_in_flight: int = MAX_IN_FLIGHT_JOBS, waiter: JobWaiter = None, cache: TranscriptCache = None, timing: dict[str, float] = None, slots: threading.Semaphore = None) -> any:
+    with tempfile.TemporaryDirectory() as directory:
+        # Return None when ffmpeg fails on the audio, so the file is submitted whole
+        try:
+            segments = plan_segments(duration, detect_silences(path), segment_seconds)
+            segment_paths = split_audio(path, segments, directory)
+        except subprocess.CalledProcessError as error:
+            print(f'Warning: [Could not segment {os.path.basename(path)}, submitting it whole: {error}]')
+            return None
+
+        # Submit the segments concurrently, the latency follows the segment size instead of the recording length
+        # The threads only wait for a slot, the shared slots keep the segments of every file within the in-flight limit
+        segment_timings = [{} for _ in segments]
+        with ThreadPoolExecutor(max_workers=max(1, min(len(segment_paths), max_in_flight))) as executor:
+            transcripts = list(executor.map(transcribe_segment, itertools.repeat(transcriber), segment_paths, itertools.repeat(waiter), itertools.repeat(cache), segment_timings, itertools.repeat(slots)))
+
+    # The transfers and polls add up, the waiting overlaps so the longest segment counts
+    if timing is not None:
+        timing['Segments'] = len(segments)
+        for key in ('Upload (Seconds)', 'Download (Seconds)', 'Polls'):
+            timing[key] = sum(segment_timing.get(key, 0) for segment_timing in segment_timings)
+        for key in ('Waiting (Seconds)', 'Processing (Seconds)'):
+            values = [segment_timing[key] for segment_timing in segment_timings if key in segment_timing]
+            if values:
+                timing[key] = max(values)
+        if 'Waiting (Seconds)' in timing and 'Processing (Seconds)' in timing:
+            timing['Polling Overhead (Seconds)'] = max(0.0, timing['Waiting (Seconds)'] - timing['Processing (Seconds)'])
+
+    return stitch_transcripts(transcripts, [start for start, _ in segments])
+
+# Function to transcribe a single audio file, returning its dialogue and timing
+def transcribe_audio_file(transcriber: Transcriber, input_folder: str, audio_filename: str, waiter: JobWaiter = None, cache: TranscriptCache = None, segment_seconds: float = SEGMENT_SECONDS, max_in_flight: int = MAX_IN_FLIGHT_JOBS, slots: threading.Semaphore = None) -> tuple[dict[str, any], dict[str, float]]:
+    # Use os.path.join to create the full path for each file
+    path = os.path.join(input_folder, audio_filename)
+
+    # Serve the transcript from the cache when the same audio was transcribed before, segmenting changes the transcript
+    cache_key = get_cache_key(transcriber, cache, path, segment_seconds)
+    cached_json = cache.get(cache_key) if cache else None
+    if cached_json is not None:
+        print(f'Success: [Loaded {audio_filename} Dialogue from cache]')
+        return create_dialogue(audio_filename, cached_json), {"filename": audio_filename, "RTF (Seconds)": None, "Cached": True}
+
+    # Record the start time
+    print(f'Start: [Processing {audio_filename}]')
+    start_time = time.time()
+    timing = {"filename": audio_filename, "Transcriber": transcriber.name, "Audio Duration (Seconds)": get_audio_duration(path)}
+
+    # process the audio, long audio in segments
+    duration = timing['Audio Duration (Seconds)']
+    segmented = bool(segment_seconds and duration and duration > segment_seconds)
+    if segmented:
+        json_data = transcribe_segments(transcriber, path, duration, segment_seconds, max_in_flight, waiter, cache, timing, slots)
+        segmented = json_data is not None
+
+        # The whole file is cached like audio that was never segmented
+        if not segmented:
+            cache_key = get_cache_key(transcriber, cache, path)
+    if not segmented:
+        job_id = process_audio_file(transcriber, path, waiter, timing, slots)
+
+    # Calculate the elapsed time
+    elapsed_time = time.time() - start_time
+    print(f'Success: [Processed {audio_filename} in {elapsed_time} sec]')
+
+    # Get the dialogue dictionary
+    print(f'Start: [Processing {audio_filename} Dialogue]')
+    if segmented:
+        if cache:
+            cache.put(cache_key, json_data)
+        dialogue = create_dialogue(audio_filename, json_data)
+    else:
+        dialogue = process_job(transcriber, audio_filename, job_id, cache, cache_key, timing)
+    print(f'Success: [Processing {audio_filename} Dialogue]')
+
+    # Wall-clock time around the processing, kept under its original key, and the real-time factors
+    timing['RTF (Seconds)'] = elapsed_time
+    timing['Total (Seconds)'] = time.time() - start_time
+    add_real_time_factors(timing)
+    return dialogue, timing
+
+# Function to transcribe the audio files concurrently, keeping at most max_in_flight jobs running
+def transcribe_audio_files(transcriber: Transcriber, input_folder: str, audio_filenames: list[str], max_in_flight: int = MAX_IN_FLIGHT_JOBS, waiter: JobWaiter = None, cache: TranscriptCache = None, segment_seconds: float = SEGMENT_SECONDS) -> tuple[list[dict[str, any]], list[dict[str, float]]]:
+    # All jobs share the poll-rate budget of a single waiter, and the in-flight slots whether they are files or segments
+    waiter = waiter or JobWaiter(PollRateLimiter(POLLS_PER_SECOND))
+    slots = threading.BoundedSemaphore(max(1, max_in_flight))
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_in_flight)) as executor:
+        futures = {executor.submit(transcribe_audio_file, transcriber, input_folder, audio_filename, waiter, cache, segment_seconds, max_in_flight, slots): audio_filename for audio_filename in audio_filenames}
+
+        # Collect the transcripts as each job completes, skipping the ones that failed
+        for future in as_completed(futures):
+            try:
+                results[futures[future]] = future.result()
+            except (JobFailedError, TimeoutError) as error:
+                print(f'Error: [{error}]')
+
+    # Keep the order of the input files
+    data = [results[audio_filename][0] for audio_filename in audio_filenames if audio_filename in results]
+    rtf_scores = [results[audio_filename][1] for audio_filename in audio_filenames if audio_filename in results]
+    return data, rtf_scores
 
 def main() -> None:
+    # Parse the command line options
+    parser = argparse.ArgumentParser(description='Transcribe the audio files and convert the transcripts in the input folder')
+    parser.add_argument('input_folder', nargs='?', default='input', help='folder containing the audio and transcript files')
+    parser.add_argument('--transcriber', choices=['revai', 'fixture', 'vosk'], default='revai', help='speech recognition backend, the local backends work without network access')
+    parser.add_argument('--fixture-dir', default=os.path.join('input', 'fixtures'), help='directory of the json or text transcripts replayed by the fixture backend')
+    parser.add_argument('--vosk-model', default=None, help='directory of the model used by the vosk backend')
+    parser.add_argument('--batch-size', type=int, default=LOCAL_BATCH_SIZE, help='maximum number of files a local backend transcribes per batch')
+    parser.add_argument('--max-in-flight', type=int, default=MAX_IN_FLIGHT_JOBS, help='maximum number of audio files transcribed at the same time')
+    parser.add_argument('--poll-rate', type=float, default=POLLS_PER_SECOND, help='maximum number of job status requests per second across all jobs')
+    parser.add_argument('--job-timeout', type=float, default=None, help='seconds to wait for a job before giving up on it')
+    parser.add_argument('--callback-url', default=None, help='public url forwarded to the local listener, Rev.ai notifies it instead of being polled')
+    parser.add_argument('--callback-port', type=int, default=8000, help='port of the local callback listener')
+    parser.add_argument('--callback-wait', type=float, default=None, help='seconds to wait for a callback before polling the job in case it got lost, defaults to the maximum poll delay')
+    parser.add_argument('--cache-dir', default=CACHE_DIRECTORY, help='directory of the transcript cache')
+    parser.add_argument('--cache-size-mb', type=float, default=CACHE_SIZE_MB, help='size limit of the transcript cache, least recently used entries are evicted')
+    parser.add_argument('--no-cache', action='store_true', help='always submit the audio files, without reading or writing the cache')
+    parser.add_argument('--segment-seconds', type=float, default=SEGMENT_SECONDS, help='split audio longer than this at silences and transcribe the segments concurrently, 0 disables it')
+    parser.add_argument('--output-format', choices=['jsonl', 'json'], default=OUTPUT_FORMAT, help='format of the audio and transcript outputs in the build folder')
+    parser.add_argument('--conflict-policy', choices=['first', 'last', 'all'], default=TRANSCRIPT_CONFLICT_POLICY, help='which transcript file to keep when an audio file appears in several')
+    parser.add_argument('--parse-workers', type=int, default=None, help='number of processes parsing the transcript files')
+    args = parser.parse_args()
+
     # Define the input folder from args when available
-    input_folder = sys.argv[1] if len(sys.argv) >= 2 else 'input'
+    input_folder = args.input_folder
     filenames = os.listdir(input_folder)
 
     # Filter filenames to include only .txt files
@@ -109,49 +483,50 @@ def main() -> None:
     media_formats = ['.m4a', '.mp1', '.mp2', '.mp3', '.wav', '.mp4', '.flac', '.rso', '.ape'] # Add more formats as needed
     audio_filenames = [filename for filename in filenames if any(filename.endswith(format) for format in media_formats)]
 
-    # Handle all of the input files
-    data = []
-    rtf_scores = []
-    for audio_filename in audio_filenames:
-        # Use os.path.join to create the full path for each file
-        path = os.path.join(input_folder, audio_filename)
-
-        # Record the start time
-        print(f'Start: [Processing {audio_filename}]')
-        start_time = time.time()
-
-        # process the audio
-        job_id = process_audio_file(path)
-
-        # Record the end time
-        end_time = time.time()
-
-        # Calculate the elapsed time
-        elapsed_time = end_time - start_time
-        print(f'Success: [Processed {audio_filename} in {elapsed_time} sec]')
-        
-        # Get the dialogue dictionary
-        print(f'Start: [Processing {audio_filename} Dialogue]')
-        dialogue = process_job(audio_filename, job_id)
-        print(f'Success: [Processing {audio_filename} Dialogue]')
-
-        # Append the dialogue to the data array
-        data.append(dialogue)
-        rtf_scores.append({"filename": audio_filename, "RTF (Seconds)": elapsed_time})
+    # Sorted, so the analysis can join the outputs by filename without sorting them first
+    audio_filenames.sort()
+
+    # Handle all of the input files, listening for callbacks when a callback url is given
+    limiter = PollRateLimiter(args.poll_rate)
+    cache = None if args.no_cache else TranscriptCache(args.cache_dir, int(args.cache_size_mb * 1024 * 1024))
+    segment_seconds = args.segment_seconds
+    if segment_seconds and not can_segment():
+        print('Warning: [ffmpeg was not found, long audio files are submitted whole]')
+        segment_seconds = 0
+    with create_transcriber(args.transcriber, args.fixture_dir, args.vosk_model, args.batch_size) as transcriber:
+        if args.callback_url:
+            with CallbackListener(args.callback_url, args.callback_port) as listener:
+                waiter = JobWaiter(limiter, listener, args.job_timeout, callback_wait=args.callback_wait)
+                data, rtf_scores = transcribe_audio_files(transcriber, input_folder, audio_filenames, args.max_in_flight, waiter, cache, segment_seconds)
+        else:
+            waiter = JobWaiter(limiter, timeout=args.job_timeout)
+            data, rtf_scores = transcribe_audio_files(transcriber, input_folder, audio_filenames, args.max_in_flight, waiter, cache, segment_seconds)
+
+    # Summarize the timings across the batch
+    rtf_scores.append({"filename": None, "Timing Summary": summarize_timings(rtf_scores)})
+
+    # Summarize the cache usage
+    if cache:
+        stats = cache.get_stats()
+        print(f'Cache: [{stats["hits"]} hits, {stats["misses"]} misses, {stats["evictions"]} evictions, {round(stats["bytes"] / (1024 * 1024), 2)} MB]')
     
-    # Save the output in a .json file
-    output_path = os.path.join('build', 'audio_output.json')
-    save_data_as_json(output_path, data)
+    # Save the output as json lines or as a .json file
+    extension = '.jsonl' if args.output_format == 'jsonl' else '.json'
+    output_path = os.path.join('build', 'audio_output' + extension)
+    save_build_file(output_path, ({"filename": dialogue['filename'], "text": dialogue['text']} for dialogue in data))
+
+    # Save the speakers, timestamps and confidences of the words compactly for the time and speaker breakdowns
+    output_path = os.path.join('build', 'audio_words' + extension)
+    save_build_file(output_path, ({"filename": dialogue['filename'], **dialogue['timings']} for dialogue in data), compact=True)
 
     # Save the output in a .json file
     output_path = os.path.join('build', 'results.json')
     save_data_as_json(output_path, rtf_scores)
 
-    # Clean the txt files
-    for txt_filename in txt_filenames:
-        input_path = os.path.join(input_folder, txt_filename)
-        output_path = os.path.join('build', 'transcript_output.json')
-        convert_transcript_to_json(input_path, output_path, audio_filenames)
+    # Clean the txt files into a single output
+    input_paths = [os.path.join(input_folder, txt_filename) for txt_filename in txt_filenames]
+    output_path = os.path.join('build', 'transcript_output' + extension)
+    convert_transcripts_to_json(input_paths, output_path, audio_filenames, args.conflict_policy, args.parse_workers)
 
 if __name__ == "__main__":
-    main()
+    main()
\ No newline at end of file
@@ -0,0 +1,97 @@
+import contextlib
+import cProfile
+import pstats
+import time
+import tracemalloc
+from typing import Any, Iterator
+
+# Recorder of the file being processed, stages are not recorded while it is None
+recorder = None
+
+# Records the time and the peak traced memory of nested stages, keyed by their path like a flame graph stack
+class StageRecorder:
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.stack = []
+
+    # Context manager recording a stage, nested stages are recorded under the path of their parents
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        path = ';'.join([frame["name"] for frame in self.stack] + [name])
+        frame = {"name": name, "start": time.perf_counter(), "children": 0.0}
+
+        # The peak is reset for every stage, so the parent keeps the peak reached before it
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self.stack:
+                self.stack[-1]["peak"] = max(self.stack[-1]["peak"], peak)
+            tracemalloc.reset_peak()
+            frame["memory"] = frame["peak"] = current
+
+        self.stack.append(frame)
+        try:
+            yield
+        finally:
+            self.stack.pop()
+            elapsed = time.perf_counter() - frame["start"]
+            record = self.stages.setdefault(path, {"Seconds": 0.0, "Self Seconds": 0.0})
+            record["Seconds"] += elapsed
+            record["Self Seconds"] += elapsed - frame["children"]
+            if self.stack:
+                self.stack[-1]["children"] += elapsed
+
+            if self.trace_memory:
+                frame["peak"] = max(frame["peak"], tracemalloc.get_traced_memory()[1])
+                record["Peak Memory (Bytes)"] = max(record.get("Peak Memory (Bytes)", 0), frame["peak"] - frame["memory"])
+                if self.stack:
+                    self.stack[-1]["peak"] = max(self.stack[-1]["peak"], frame["peak"])
+
+    # Function to get the timing record of the stages
+    def get_record(self) -> dict[str, Any]:
+        return {
+            "Total (Seconds)": sum(record["Seconds"] for path, record in self.stages.items() if ';' not in path),
+            "Stages": self.stages
+        }
+
+# Function to record a stage of the current file, does nothing when no recorder is active
+def stage(name: str) -> contextlib.AbstractContextManager:
+    return recorder.stage(name) if recorder else contextlib.nullcontext()
+
+# Context manager activating a recorder for the stages of a file
+@contextlib.contextmanager
+def record_stages(trace_memory: bool = False) -> Iterator[StageRecorder]:
+    global recorder
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    previous = recorder
+    recorder = StageRecorder(trace_memory)
+    try:
+        yield recorder
+    finally:
+        recorder = previous
+
+# Function to add the self seconds of every stage path of a timing record to the totals
+def merge_stage_seconds(totals: dict[str, float], timing: dict[str, Any]) -> dict[str, float]:
+    for path, record in timing["Stages"].items():
+        totals[path] = totals.get(path, 0.0) + record["Self Seconds"]
+    return totals
+
+# Function to save stage seconds as folded stacks in microseconds, the input format of flamegraph.pl, inferno and speedscope
+def save_folded_stacks(file_path: str, totals: dict[str, float]) -> None:
+    with open(file_path, 'w') as file:
+        for path, seconds in sorted(totals.items()):
+            file.write(f'{path.replace(" ", "_")} {round(seconds * 1e6)}\n')
+
+# Context manager profiling the code it wraps with cProfile, saving the stats for snakeviz, flameprof or gprof2dot
+@contextlib.contextmanager
+def profile(file_path: str, top: int = 20) -> Iterator[cProfile.Profile]:
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(file_path)
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(top)
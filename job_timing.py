@@ -0,0 +1,68 @@
+import json
+import shutil
+import subprocess
+from datetime import datetime
+from rev_ai import Job
+
+# Percentiles reported in the timing summary of a batch
+SUMMARY_PERCENTILES = [50, 90, 99]
+
+# Timing keys that are summarized across the batch
+SUMMARY_KEYS = ['Upload (Seconds)', 'Processing (Seconds)', 'Polling Overhead (Seconds)', 'Download (Seconds)', 'RTF', 'End-to-end RTF']
+
+# Function to read the duration of an audio file locally with ffprobe or soundfile, returns None when neither works
+def get_audio_duration(path: str) -> float:
+    if shutil.which('ffprobe'):
+        try:
+            output = subprocess.run(['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'json', path], capture_output=True, check=True, text=True).stdout
+            return float(json.loads(output)['format']['duration'])
+        except (subprocess.CalledProcessError, KeyError, ValueError):
+            pass
+
+    try:
+        import soundfile
+        return soundfile.info(path).duration
+    except (ImportError, RuntimeError):
+        return None
+
+# Function to parse the timestamps returned in the job details
+def parse_timestamp(timestamp: str) -> datetime:
+    return datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+
+# Function to get the time the server spent on a job from its creation and completion timestamps
+def get_server_processing_time(job: Job) -> float:
+    if not job.created_on or not job.completed_on:
+        return None
+    try:
+        return (parse_timestamp(job.completed_on) - parse_timestamp(job.created_on)).total_seconds()
+    except ValueError:
+        return None
+
+# Function to complete the timing of a job with its real-time factors
+def add_real_time_factors(timing: dict[str, float]) -> None:
+    duration = timing.get('Audio Duration (Seconds)')
+    if not duration:
+        return
+    if timing.get('Processing (Seconds)') is not None:
+        timing['RTF'] = timing['Processing (Seconds)'] / duration
+    if timing.get('Total (Seconds)') is not None:
+        timing['End-to-end RTF'] = timing['Total (Seconds)'] / duration
+
+# Function to calculate a percentile with linear interpolation between the closest ranks
+def get_percentile(sorted_values: list[float], percentile: float) -> float:
+    position = (len(sorted_values) - 1) * percentile / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+# Function to summarize the timings of a batch with the mean and percentiles of every timing key
+def summarize_timings(timings: list[dict[str, float]]) -> dict[str, dict[str, float]]:
+    summary = {}
+    for key in SUMMARY_KEYS:
+        values = sorted(timing[key] for timing in timings if timing.get(key) is not None)
+        if not values:
+            continue
+        summary[key] = {"Mean": sum(values) / len(values)}
+        for percentile in SUMMARY_PERCENTILES:
+            summary[key][f'P{percentile}'] = get_percentile(values, percentile)
+    return summary
@@ -0,0 +1,166 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from rev_ai import apiclient, Job, JobStatus
+
+# Exception raised when a transcription job ends in the failed state
+class JobFailedError(Exception):
+    def __init__(self, job: Job):
+        super().__init__(f'Job {job.id} failed: {job.failure_detail or job.failure}')
+        self.job = job
+
+# Token bucket that shares a poll-rate budget across every in-flight job
+class PollRateLimiter:
+    def __init__(self, polls_per_second: float, burst: int = 1):
+        self.interval = 1 / polls_per_second
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    # Function to block until a poll is allowed
+    def acquire(self) -> None:
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) / self.interval)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_time = (1 - self.tokens) * self.interval
+            time.sleep(wait_time)
+
+# Request handler storing the job notifications posted by Rev.ai, the listener is unauthenticated so only the job id is used
+class CallbackHandler(BaseHTTPRequestHandler):
+    def do_POST(self) -> None:
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            job_id = body['job']['id']
+            if not isinstance(job_id, str):
+                raise ValueError(job_id)
+            self.server.listener.notify(job_id)
+            self.send_response(200)
+        except (ValueError, KeyError, TypeError):
+            self.send_response(400)
+        self.end_headers()
+
+    # Keep the transcription output readable
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+# Local HTTP listener receiving the callbacks of finished jobs so they don't have to be polled
+# A callback is only a hint that a job finished, the waiter confirms the status with the job details
+class CallbackListener:
+    def __init__(self, callback_url: str, port: int, host: str = '0.0.0.0'):
+        self.callback_url = callback_url
+        self.expected = set()
+        self.notified = set()
+        self.condition = threading.Condition()
+        self.server = ThreadingHTTPServer((host, port), CallbackHandler)
+        self.server.listener = self
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self) -> 'CallbackListener':
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    # Function to start expecting the notification of a job, notifications of other jobs are ignored
+    def expect(self, job_id: str) -> None:
+        with self.condition:
+            self.expected.add(job_id)
+
+    # Function to record the notification of an expected job
+    def notify(self, job_id: str) -> None:
+        with self.condition:
+            if job_id in self.expected:
+                self.notified.add(job_id)
+                self.condition.notify_all()
+
+    # Function to wait for the notification of a job, returns whether it arrived before the timeout
+    def wait(self, job_id: str, timeout: float = None) -> bool:
+        with self.condition:
+            notified = self.condition.wait_for(lambda: job_id in self.notified, timeout)
+            self.notified.discard(job_id)
+            return notified
+
+    # Function to forget a finished job, late or repeated notifications of it are ignored
+    def finish(self, job_id: str) -> None:
+        with self.condition:
+            self.expected.discard(job_id)
+            self.notified.discard(job_id)
+
+# Waits for jobs to finish, either through callbacks or by polling with exponential backoff and jitter
+class JobWaiter:
+    def __init__(self, limiter: PollRateLimiter = None, listener: CallbackListener = None, timeout: float = None, initial_delay: float = 1.0, max_delay: float = 30.0, callback_wait: float = None):
+        self.limiter = limiter
+        self.listener = listener
+        self.timeout = timeout
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+
+        # Seconds to wait for a callback before checking the job with a poll, a lost callback must not hang the job
+        self.callback_wait = max_delay if callback_wait is None else callback_wait
+
+    # The url passed on when submitting jobs, None when polling
+    @property
+    def callback_url(self) -> str:
+        return self.listener.callback_url if self.listener else None
+
+    # Function to wait for a job and return its final details, raising when it failed or timed out
+    def wait(self, client: apiclient.RevAiAPIClient, job_id: str, timing: dict[str, float] = None) -> Job:
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+
+        if self.listener:
+            job = self.wait_for_callback(client, job_id, deadline, timing)
+        else:
+            job = self.poll(client, job_id, deadline, timing)
+
+        if job.status == JobStatus.FAILED:
+            raise JobFailedError(job)
+        return job
+
+    # Function to wait for the callback of a job, checking the job details after every callback and every callback_wait seconds in case the callback got lost
+    def wait_for_callback(self, client: apiclient.RevAiAPIClient, job_id: str, deadline: float = None, timing: dict[str, float] = None) -> Job:
+        self.listener.expect(job_id)
+        try:
+            while True:
+                timeout = self.callback_wait if deadline is None else max(0.0, min(self.callback_wait, deadline - time.monotonic()))
+                self.listener.wait(job_id, timeout)
+                job = self.get_job_details(client, job_id, timing)
+                if job.status != JobStatus.IN_PROGRESS:
+                    return job
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError(f'Job {job_id} did not finish in time')
+        finally:
+            self.listener.finish(job_id)
+
+    # Function to get the details of a job within the shared poll-rate budget
+    def get_job_details(self, client: apiclient.RevAiAPIClient, job_id: str, timing: dict[str, float] = None) -> Job:
+        if self.limiter:
+            self.limiter.acquire()
+        job = client.get_job_details(job_id)
+        if timing is not None:
+            timing['Polls'] = timing.get('Polls', 0) + 1
+        return job
+
+    # Function to poll a job until it leaves the in progress state
+    def poll(self, client: apiclient.RevAiAPIClient, job_id: str, deadline: float = None, timing: dict[str, float] = None) -> Job:
+        delay = self.initial_delay
+        while True:
+            job = self.get_job_details(client, job_id, timing)
+            if job.status != JobStatus.IN_PROGRESS:
+                return job
+
+            # Sleep a random part of the current delay so jobs submitted together don't poll together
+            sleep_time = random.uniform(delay / 2, delay)
+            if deadline is not None and time.monotonic() + sleep_time > deadline:
+                raise TimeoutError(f'Job {job_id} did not finish in time')
+            time.sleep(sleep_time)
+            delay = min(self.max_delay, delay * 2)
@@ -0,0 +1,118 @@
+import functools
+import json
+import re
+import string
+import sys
+import unicodedata
+import numpy as np
+from typing import Any, Callable
+
+# Default normalization settings, these reproduce the original preprocessing of ascii punctuation and lowercasing
+DEFAULT_SETTINGS = {
+    "unicode_punctuation": False,
+    "casefold": False,
+    "numbers": False,
+    "contractions": False,
+    "lexicon": {}
+}
+
+# Contractions expanded before the punctuation is removed, the ambiguous 's is left alone
+CONTRACTIONS = {
+    "won't": "will not",
+    "can't": "can not",
+    "shan't": "shall not",
+    "n't": " not",
+    "'re": " are",
+    "'ve": " have",
+    "'ll": " will",
+    "'d": " would",
+    "'m": " am"
+}
+
+# Whole words first, then the suffixes, which only count right after a letter and at the end of a word so quotes stay intact
+CONTRACTION_PATTERN = r"\b(?:won't|can't|shan't)\b|(?<=[a-z])(?:n't|'re|'ve|'ll|'d|'m)\b"
+
+# Apostrophe look-alikes that should behave like the ascii apostrophe
+APOSTROPHES = str.maketrans({'‘': "'", '’': "'", 'ʼ': "'", '′': "'"})
+
+# Words used to spell out numbers
+ONES = ['zero', 'one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine', 'ten', 'eleven', 'twelve', 'thirteen', 'fourteen', 'fifteen', 'sixteen', 'seventeen', 'eighteen', 'nineteen']
+TENS = ['', '', 'twenty', 'thirty', 'forty', 'fifty', 'sixty', 'seventy', 'eighty', 'ninety']
+SCALES = [(10 ** 12, 'trillion'), (10 ** 9, 'billion'), (10 ** 6, 'million'), (1000, 'thousand'), (100, 'hundred')]
+
+# Numbers with optional thousands separators and decimals, like 1,000 or 3.5, standing on their own
+# Numbers glued to letters or other numbers, like 2nd, 1990s or v1.2.3, are left alone instead of splitting off stray tokens
+NUMBER_PATTERN = re.compile(r'(?<!\w)(?<!\d\.)(?:\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)(?!\w)(?!\.\d)')
+
+# Function to spell out a whole number in english words
+def number_to_words(number: int) -> str:
+    if number < 20:
+        return ONES[number]
+    if number < 100:
+        return TENS[number // 10] + ('' if number % 10 == 0 else ' ' + ONES[number % 10])
+    for scale, name in SCALES:
+        if number >= scale:
+            words = number_to_words(number // scale) + ' ' + name
+            return words if number % scale == 0 else words + ' ' + number_to_words(number % scale)
+
+# Function to spell out a matched number, reading the decimals digit by digit
+def spell_number(match: re.Match) -> str:
+    whole, _, decimals = match.group(0).replace(',', '').partition('.')
+    words = number_to_words(int(whole))
+    if decimals:
+        words += ' point ' + ' '.join(ONES[int(digit)] for digit in decimals)
+    return f' {words} '
+
+# Function to build the table deleting every unicode punctuation and symbol character, built once
+@functools.lru_cache(maxsize=None)
+def get_unicode_punctuation_table() -> dict[int, None]:
+    table = dict.fromkeys(ord(character) for character in string.punctuation)
+    for codepoint in range(sys.maxunicode + 1):
+        if unicodedata.category(chr(codepoint))[0] in ('P', 'S'):
+            table[codepoint] = None
+    return table
+
+# Function to compile the normalization settings into a function from text to words, cached per settings
+@functools.lru_cache(maxsize=None)
+def compile_normalizer(settings_key: str) -> Callable[[str], list[str]]:
+    settings = {**DEFAULT_SETTINGS, **json.loads(settings_key)}
+    lexicon = settings["lexicon"]
+    punctuation_table = get_unicode_punctuation_table() if settings["unicode_punctuation"] else str.maketrans('', '', string.punctuation)
+    contraction_pattern = re.compile(CONTRACTION_PATTERN) if settings["contractions"] else None
+
+    def normalize(text: str) -> list[str]:
+        if settings["unicode_punctuation"]:
+            text = unicodedata.normalize('NFKC', text).translate(APOSTROPHES)
+        text = text.casefold() if settings["casefold"] else text.lower()
+        if contraction_pattern:
+            text = contraction_pattern.sub(lambda match: CONTRACTIONS[match.group(0)], text)
+        if settings["numbers"]:
+            text = NUMBER_PATTERN.sub(spell_number, text)
+        words = text.translate(punctuation_table).split()
+
+        # Replace words from the lexicon, a replacement may be several words or none
+        if lexicon:
+            words = [replacement for word in words for replacement in (lexicon[word].split() if word in lexicon else [word])]
+        return words
+
+    return normalize
+
+# Function to get the normalizer of a set of settings
+def get_normalizer(settings: dict[str, Any] = None) -> Callable[[str], list[str]]:
+    return compile_normalizer(json.dumps({**DEFAULT_SETTINGS, **(settings or {})}, sort_keys=True))
+
+# Function to load a replacement lexicon, either a json object or lines of a word, a tab and its replacement
+def load_lexicon(file_path: str) -> dict[str, str]:
+    with open(file_path, 'r', encoding='utf-8') as file:
+        content = file.read()
+    if content.lstrip().startswith('{'):
+        return json.loads(content)
+    return dict(line.split('\t', 1) for line in content.splitlines() if '\t' in line)
+
+# Function to normalize a batch of texts into interned token id arrays sharing one vocabulary, with the normalizer of the settings unless one is given
+def tokenize_texts(texts: list[str], settings: dict[str, Any] = None, normalize: Callable[[str], list[str]] = None) -> tuple[list[list[str]], list[np.ndarray]]:
+    normalize = normalize or get_normalizer(settings)
+    vocabulary = {}
+    word_arrays = [normalize(text) for text in texts]
+    token_arrays = [np.fromiter((vocabulary.setdefault(word, len(vocabulary)) for word in words), dtype=np.int32, count=len(words)) for words in word_arrays]
+    return word_arrays, token_arrays
@@ -0,0 +1,97 @@
+import random
+import numpy as np
+import pytest
+import analyze_build
+
+# Words drawn from a small vocabulary, so repeated words and ambiguous alignments are common
+VOCABULARY = ['the', 'a', 'cat', 'sat', 'on', 'mat', 'dog', 'ran', 'to', 'it']
+
+# Function to make a random reference and a hypothesis with substitutions, deletions and insertions
+def make_pair(rng: random.Random, length: int, error_rate: float) -> tuple[list[str], list[str]]:
+    reference = [rng.choice(VOCABULARY) for _ in range(length)]
+    hypothesis = []
+    for word in reference:
+        roll = rng.random()
+        if roll < error_rate / 3:
+            continue
+        if roll < 2 * error_rate / 3:
+            hypothesis.append(rng.choice(VOCABULARY))
+        elif roll < error_rate:
+            hypothesis += [word, rng.choice(VOCABULARY)]
+        else:
+            hypothesis.append(word)
+    return reference, hypothesis
+
+def make_pairs(count: int = 60, max_length: int = 80) -> list[tuple[list[str], list[str]]]:
+    rng = random.Random(0)
+    pairs = [([], []), (['cat'], []), ([], ['cat']), (['cat'], ['dog'])]
+    pairs += [make_pair(rng, rng.randint(1, max_length), rng.choice([0.05, 0.3, 0.8])) for _ in range(count)]
+    return pairs
+
+@pytest.mark.parametrize('ref_words, hyp_words', make_pairs())
+def test_levenshtein_distance_matches_reference(ref_words, hyp_words):
+    expected = analyze_build.levenshtein_distance_reference(ref_words, hyp_words)
+    np.testing.assert_array_equal(analyze_build.levenshtein_distance(ref_words, hyp_words), expected)
+    assert analyze_build.levenshtein_distance_value(ref_words, hyp_words) == expected[-1, -1]
+
+@pytest.mark.parametrize('ref_words, hyp_words', make_pairs()[4:])
+def test_reference_alignment_is_unchanged_by_the_vectorized_matrix(ref_words, hyp_words):
+    expected = analyze_build.map_aligning_values(analyze_build.levenshtein_distance_reference(ref_words, hyp_words))
+    assert analyze_build.map_aligning_values(analyze_build.levenshtein_distance(ref_words, hyp_words)) == expected
+
+# Function to check that matching words form an optimal alignment, the errors between the matches add up to the edit distance
+def assert_optimal_alignment(value_alignments: list[int], ref_words: list[str], hyp_words: list[str]) -> None:
+    matches = [(i, j) for i, j in enumerate(value_alignments) if j != None]
+    assert all(ref_words[i] == hyp_words[j] for i, j in matches)
+    assert all(j1 < j2 for (_, j1), (_, j2) in zip(matches, matches[1:]))
+    _, _, (S, D, I, _) = analyze_build.align_matched_words(value_alignments, ref_words, hyp_words)
+    assert S + D + I == analyze_build.levenshtein_distance_value(ref_words, hyp_words)
+
+@pytest.mark.parametrize('ref_words, hyp_words', make_pairs())
+def test_linear_alignment_is_optimal(ref_words, hyp_words):
+    assert_optimal_alignment(analyze_build.map_aligning_values_linear(ref_words, hyp_words), ref_words, hyp_words)
+
+# Settings of the banded and anchored modes, with bands narrow enough to exercise every fallback
+BANDED_MODES = {
+    "banded": {},
+    "band-memory-fallback": {"BAND_MEMORY_BYTES": 100},
+    "narrow-initial-band": {"INITIAL_BAND_WIDTH": 1}
+}
+
+@pytest.mark.parametrize('mode', BANDED_MODES)
+def test_banded_alignment_is_optimal(mode, monkeypatch):
+    for name, value in BANDED_MODES[mode].items():
+        monkeypatch.setattr(analyze_build, name, value)
+    for ref_words, hyp_words in make_pairs():
+        assert_optimal_alignment(analyze_build.map_aligning_values_banded(ref_words, hyp_words), ref_words, hyp_words)
+
+@pytest.mark.parametrize('ngram_length', [2, 3, 6])
+def test_anchored_alignment_is_optimal(ngram_length):
+    for ref_words, hyp_words in make_pairs():
+        assert_optimal_alignment(analyze_build.map_aligning_values_anchored(ref_words, hyp_words, ngram_length), ref_words, hyp_words)
+
+def test_anchors_are_unique_increasing_runs():
+    ref_words = 'a b c d e f x y a b'.split()
+    hyp_words = 'q a b c d e f z y'.split()
+    assert analyze_build.find_alignment_anchors(ref_words, hyp_words, 3) == [(0, 1, 6)]
+
+# Settings of every exact alignment mode, the reference mode is left out because its heuristic is not exact
+ALIGNMENT_MODES = {
+    "full": {},
+    "linear": {"LINEAR_MEMORY_THRESHOLD": 0},
+    "banded": {"USE_BANDED_ALIGNMENT": True},
+    "anchored": {"ANCHOR_NGRAM_LENGTH": 3}
+}
+
+@pytest.mark.parametrize('mode', ALIGNMENT_MODES)
+def test_alignment_errors_add_up_to_edit_distance(mode, monkeypatch):
+    for name, value in ALIGNMENT_MODES[mode].items():
+        monkeypatch.setattr(analyze_build, name, value)
+
+    for ref_words, hyp_words in make_pairs():
+        reference, recognized, (S, D, I, C) = analyze_build.align(ref_words, hyp_words)
+        assert S + D + I == analyze_build.levenshtein_distance_value(ref_words, hyp_words)
+        assert S + D + C == len(ref_words)
+        assert [word for word in reference if word != None] == ref_words
+        assert [word for word in recognized if word != None] == hyp_words
+        assert (S, D, I, C) == analyze_build.analyse_aligned_words(reference, recognized)
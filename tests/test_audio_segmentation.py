@@ -0,0 +1,36 @@
+import pytest
+from audio_segmentation import MIN_SEGMENT_SECONDS, plan_segments, stitch_transcripts
+from transcribers import create_transcript_json
+
+def test_short_audio_is_a_single_segment():
+    assert plan_segments(20.0, [(5.0, 6.0)], 30) == [(0.0, 20.0)]
+
+def test_segments_cut_in_the_middle_of_the_last_silence_before_the_limit():
+    assert plan_segments(70.0, [(10.0, 12.0), (20.0, 24.0), (40.0, 41.0)], 30) == [(0.0, 22.0), (22.0, 40.5), (40.5, 70.0)]
+
+def test_segments_cut_through_speech_without_a_silence():
+    assert plan_segments(70.0, [], 30) == [(0.0, 30.0), (30.0, 60.0), (60.0, 70.0)]
+
+@pytest.mark.parametrize('duration', [30.0001, 30.5, 60.9])
+def test_a_short_tail_is_merged_into_the_previous_segment(duration):
+    segments = plan_segments(duration, [], 30)
+    assert segments[-1][1] == duration
+    assert all(end - start >= MIN_SEGMENT_SECONDS for start, end in segments)
+    assert all(end - start < 30 + MIN_SEGMENT_SECONDS for start, end in segments)
+
+def test_a_silence_right_after_the_start_is_not_a_cut():
+    assert plan_segments(40.0, [(0.0, 0.5)], 30) == [(0.0, 30.0), (30.0, 40.0)]
+
+def test_stitched_timestamps_are_shifted_by_their_segment_start():
+    transcripts = [create_transcript_json([('a', 0.0, 0.5, 1.0), ('b', 1.0, 1.5, 1.0)]), create_transcript_json([('c', 0.25, 0.75, 1.0)])]
+    stitched = stitch_transcripts(transcripts, [0.0, 30.0])
+    elements = [element for monologue in stitched['monologues'] for element in monologue['elements'] if element['type'] == 'text']
+    assert [(element['value'], element['ts'], element['end_ts']) for element in elements] == [('a', 0.0, 0.5), ('b', 1.0, 1.5), ('c', 30.25, 30.75)]
+
+    # The segments are not changed
+    assert transcripts[1]['monologues'][0]['elements'][0]['ts'] == 0.25
+
+def test_stitched_speakers_are_prefixed_with_their_segment():
+    transcripts = [create_transcript_json([('a', 0.0, 0.5, 1.0)], speaker=0), create_transcript_json([('b', 0.0, 0.5, 1.0)], speaker=0), create_transcript_json([('c', 0.0, 0.5, 1.0)], speaker=1)]
+    stitched = stitch_transcripts(transcripts, [0.0, 30.0, 60.0])
+    assert [monologue['speaker'] for monologue in stitched['monologues']] == ['0:0', '1:0', '2:1']
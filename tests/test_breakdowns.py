@@ -0,0 +1,61 @@
+import pytest
+import analyze_build
+from test_alignment import make_pairs
+
+REFERENCE = ['a', 'b', 'c', None, 'e']
+RECOGNIZED = ['a', 'x', None, 'y', 'e']
+SPEAKERS = ['0', '0', '1', '1']
+STARTS = [0.0, 30.0, 61.0, 125.0]
+
+def test_character_statistics_count_the_normalized_characters():
+    assert analyze_build.calc_character_statistics('Hello, World!', 'hello word') == {"Characters": 11, "Character Errors": 1}
+
+@pytest.mark.parametrize('ref_words, hyp_words', make_pairs(count=10))
+def test_character_errors_match_the_reference_distance(ref_words, hyp_words):
+    transcript_text, audio_text = ' '.join(ref_words), ' '.join(hyp_words)
+    statistics = analyze_build.calc_character_statistics(transcript_text, audio_text)
+    assert statistics["Character Errors"] == analyze_build.levenshtein_distance_reference(list(transcript_text), list(audio_text))[-1][-1]
+
+def test_timed_words_keep_the_speaker_and_start_of_their_element(monkeypatch):
+    monkeypatch.setattr(analyze_build, 'NORMALIZATION', {"numbers": True})
+    word_timings = {"words": ["It's", '42', '!'], "speakers": [0, 1, 1], "start": [0.5, 1.0, 2.0]}
+    assert analyze_build.get_timed_words(word_timings) == (['its', 'forty', 'two'], ['0', '1', '1'], [0.5, 1.0, 1.0])
+
+def test_breakdowns_attribute_deletions_to_the_previous_recognized_word(monkeypatch):
+    monkeypatch.setattr(analyze_build, 'TIME_WINDOW_SECONDS', 60.0)
+    breakdowns = analyze_build.calc_breakdown_statistics(REFERENCE, RECOGNIZED, SPEAKERS, STARTS)
+    assert breakdowns == {
+        "Speakers": {
+            '0': {"Substitutions": 1, "Deletions": 1, "Insertions": 0, "Corrects": 1},
+            '1': {"Substitutions": 0, "Deletions": 0, "Insertions": 1, "Corrects": 1}
+        },
+        "Windows": {
+            '0': {"Substitutions": 1, "Deletions": 1, "Insertions": 0, "Corrects": 1},
+            '60': {"Substitutions": 0, "Deletions": 0, "Insertions": 1, "Corrects": 0},
+            '120': {"Substitutions": 0, "Deletions": 0, "Insertions": 0, "Corrects": 1}
+        }
+    }
+
+def test_breakdowns_give_a_leading_deletion_to_the_first_word():
+    breakdowns = analyze_build.calc_breakdown_statistics(['a', 'b'], [None, 'b'], ['3'], [None])
+    assert breakdowns == {"Speakers": {'3': {"Substitutions": 0, "Deletions": 1, "Insertions": 0, "Corrects": 1}}, "Windows": {}}
+
+def test_breakdowns_without_timed_words_are_empty():
+    assert analyze_build.calc_breakdown_statistics(['a'], [None], [], []) == {"Speakers": {}, "Windows": {}}
+
+def test_breakdown_metrics_leave_the_wer_of_only_insertions_undefined():
+    assert analyze_build.calc_breakdown_metrics({"Substitutions": 1, "Deletions": 1, "Insertions": 0, "Corrects": 1})["WER"] == pytest.approx(2 / 3)
+    assert analyze_build.calc_breakdown_metrics({"Substitutions": 0, "Deletions": 0, "Insertions": 1, "Corrects": 0}) == {"N": 0, "Substitutions": 0, "Deletions": 0, "Insertions": 1, "Corrects": 0, "WER": None}
+
+def test_score_job_adds_the_breakdowns_of_matching_word_timings(monkeypatch):
+    monkeypatch.setattr(analyze_build, 'TIME_WINDOW_SECONDS', 60.0)
+    word_timings = {"words": ['a', 'x', 'y', 'e'], "speakers": [0, 0, 1, 1], "start": STARTS}
+    _, _, data, _ = analyze_build.score_job('test1_a.wav', 'a b c e', 'a x y e', word_timings)
+    assert data["Speakers"]['0']["N"] + data["Speakers"]['1']["N"] == 4
+    assert list(data["Windows"]) == ['0', '60', '120']
+
+def test_score_job_skips_the_breakdowns_of_mismatched_word_timings(capsys):
+    word_timings = {"words": ['a'], "speakers": [0], "start": [0.0]}
+    _, _, data, _ = analyze_build.score_job('test1_a.wav', 'a b c e', 'a x y e', word_timings)
+    assert "Speakers" not in data and "Windows" not in data
+    assert 'do not match its text' in capsys.readouterr().out
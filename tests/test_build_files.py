@@ -0,0 +1,77 @@
+import io
+import os
+import json
+import pytest
+import build_files
+
+ENTRIES = [
+    {"filename": "b.wav", "text": "brackets ] [ and commas , inside"},
+    {"filename": "a.wav", "text": "quotes \" and \\ escapes", "timings": {"words": ["x", "y"], "start": [0.0, 1.5]}},
+    {"filename": "c.wav", "text": ""},
+    {"filename": "a.wav", "text": "a second dialogue"}
+]
+
+# Read sizes smaller than a single entry, so every entry is split across several reads
+@pytest.mark.parametrize('read_size', [1, 2, 3, 7, 64, 1 << 20])
+@pytest.mark.parametrize('indent', [None, 2])
+def test_iter_json_array_across_chunk_boundaries(read_size, indent, monkeypatch):
+    monkeypatch.setattr(build_files, 'READ_SIZE', read_size)
+    assert list(build_files.iter_json_array(io.StringIO(json.dumps(ENTRIES, indent=indent)))) == ENTRIES
+
+@pytest.mark.parametrize('text', ['[]', ' [ ] ', '\n[\n]\n'])
+def test_iter_json_array_empty(text, monkeypatch):
+    monkeypatch.setattr(build_files, 'READ_SIZE', 1)
+    assert list(build_files.iter_json_array(io.StringIO(text))) == []
+
+def test_iter_json_array_truncated():
+    with pytest.raises(json.JSONDecodeError):
+        list(build_files.iter_json_array(io.StringIO(json.dumps(ENTRIES)[:-10])))
+
+def test_json_lines_and_array_files_match(tmp_path):
+    build_files.write_json_lines(str(tmp_path / 'entries.jsonl'), ENTRIES)
+    (tmp_path / 'entries.json').write_text(json.dumps(ENTRIES, indent=2))
+    assert list(build_files.iter_json_entries(str(tmp_path / 'entries.jsonl'))) == ENTRIES
+    assert list(build_files.iter_json_entries(str(tmp_path / 'entries.json'))) == ENTRIES
+
+@pytest.mark.parametrize('run_size', [1, 2, 3, 100])
+def test_sort_entries_is_stable(run_size):
+    expected = sorted(ENTRIES, key=lambda entry: entry['filename'])
+    assert list(build_files.sort_entries(ENTRIES, run_size=run_size)) == expected
+
+def test_empty_build_files_have_no_entries(tmp_path):
+    (tmp_path / 'empty.jsonl').write_text('\n\n')
+    assert list(build_files.iter_json_entries(str(tmp_path / 'empty.jsonl'))) == []
+
+def test_unsorted_files_are_sorted_when_streamed(tmp_path):
+    build_files.write_json_lines(str(tmp_path / 'entries.jsonl'), ENTRIES)
+    assert not build_files.is_sorted(str(tmp_path / 'entries.jsonl'))
+    assert [entry['filename'] for entry in build_files.iter_sorted_entries(str(tmp_path / 'entries.jsonl'))] == ['a.wav', 'a.wav', 'b.wav', 'c.wav']
+
+def test_join_matches_every_left_entry_with_the_right_streams():
+    left = [{"filename": 'a.wav'}, {"filename": 'a.wav'}, {"filename": 'c.wav'}, {"filename": 'd.wav'}]
+    audio = [{"filename": 'a.wav', "text": 'a'}, {"filename": 'b.wav', "text": 'b'}, {"filename": 'd.wav', "text": 'd'}]
+    timings = [{"filename": 'c.wav', "words": []}]
+    joined = list(build_files.join_sorted_entries(left, audio, timings))
+    assert joined == [
+        (left[0], audio[0], None),
+        (left[1], audio[0], None),
+        (left[2], None, timings[0]),
+        (left[3], audio[2], None)
+    ]
+
+def test_find_build_file_prefers_the_newer_file(tmp_path):
+    base_path = str(tmp_path / 'audio_output')
+    assert build_files.find_build_file(base_path) == base_path + '.jsonl'
+    (tmp_path / 'audio_output.json').write_text('[]')
+    assert build_files.find_build_file(base_path) == base_path + '.json'
+    (tmp_path / 'audio_output.jsonl').write_text('')
+    os.utime(base_path + '.json', (1_000_000_000, 1_000_000_000))
+    assert build_files.find_build_file(base_path) == base_path + '.jsonl'
+
+def test_save_json_atomic_leaves_no_partial_file(tmp_path):
+    path = str(tmp_path / 'manifest.json')
+    build_files.save_json_atomic(path, {"a": 1})
+    with pytest.raises(TypeError):
+        build_files.save_json_atomic(path, {"a": object()})
+    assert json.loads((tmp_path / 'manifest.json').read_text()) == {"a": 1}
+    assert os.listdir(tmp_path) == ['manifest.json']
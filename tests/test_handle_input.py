@@ -0,0 +1,178 @@
+import os
+import subprocess
+import threading
+import time
+import pytest
+from rev_ai import Job, JobStatus
+import handle_input
+from build_files import iter_json_entries
+from job_waiting import JobWaiter
+from transcribers import RevAiTranscriber, create_transcript_json
+
+# Stand-in for the Rev.ai client, every audio file is scripted by its name
+class FakeRevAiClient:
+    def __init__(self, scripts: dict[str, dict]):
+        self.scripts = scripts
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def submit_job_local_file(self, path: str, callback_url: str = None, **options) -> Job:
+        filename = os.path.basename(path)
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            job = Job(f'job-{filename}', '2024-01-01T00:00:00Z', JobStatus.IN_PROGRESS, name=filename)
+            self.jobs[job.id] = (filename, time.monotonic())
+        return job
+
+    def get_job_details(self, job_id: str) -> Job:
+        filename, submitted = self.jobs[job_id]
+        script = self.scripts[filename]
+        status = JobStatus.IN_PROGRESS
+        if time.monotonic() - submitted >= script.get('seconds', 0):
+            status = script.get('status', JobStatus.TRANSCRIBED)
+        if status != JobStatus.IN_PROGRESS:
+            with self.lock:
+                self.active -= 1
+        return Job(job_id, '2024-01-01T00:00:00Z', status, completed_on='2024-01-01T00:00:01Z', name=filename, failure='scripted' if status == JobStatus.FAILED else None)
+
+    def get_transcript_json(self, job_id: str) -> dict:
+        filename, _ = self.jobs[job_id]
+        return create_transcript_json([(word, index, index + 1, 1.0) for index, word in enumerate(self.scripts[filename]['words'])])
+
+@pytest.fixture
+def audio_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(handle_input, 'get_audio_duration', lambda path: 10.0)
+    return tmp_path
+
+# Function to transcribe scripted files, polling quickly and giving up on jobs after the timeout
+def transcribe(folder, scripts: dict[str, dict], max_in_flight: int = 4, timeout: float = None):
+    for filename in scripts:
+        (folder / filename).write_bytes(b'')
+    client = FakeRevAiClient(scripts)
+    waiter = JobWaiter(timeout=timeout, initial_delay=0.01, max_delay=0.02)
+    data, rtf_scores = handle_input.transcribe_audio_files(RevAiTranscriber(client), str(folder), list(scripts), max_in_flight, waiter)
+    return client, data, rtf_scores
+
+def test_transcribe_audio_files_keeps_input_order(audio_folder):
+    # The first files take the longest, so they finish last
+    scripts = {f'{index}.wav': {"words": [f'word{index}', 'end'], "seconds": 0.05 * (4 - index)} for index in range(4)}
+    _, data, rtf_scores = transcribe(audio_folder, scripts)
+
+    assert [dialogue['filename'] for dialogue in data] == list(scripts)
+    assert [timing['filename'] for timing in rtf_scores] == list(scripts)
+    assert [dialogue['text'] for dialogue in data] == [f'word{index} end' for index in range(4)]
+
+def test_transcribe_audio_files_skips_failed_and_timed_out_jobs(audio_folder):
+    scripts = {
+        "failed.wav": {"words": [], "status": JobStatus.FAILED},
+        "ok.wav": {"words": ['hello']},
+        "slow.wav": {"words": [], "seconds": 60}
+    }
+    _, data, rtf_scores = transcribe(audio_folder, scripts, timeout=0.2)
+
+    assert [dialogue['filename'] for dialogue in data] == ['ok.wav']
+    assert [timing['filename'] for timing in rtf_scores] == ['ok.wav']
+
+def test_transcribe_audio_files_limits_jobs_in_flight(audio_folder):
+    scripts = {f'{index}.wav': {"words": ['word'], "seconds": 0.05} for index in range(6)}
+    client, data, _ = transcribe(audio_folder, scripts, max_in_flight=2)
+
+    assert len(data) == 6
+    assert client.peak <= 2
+
+# Function to stand in for ffmpeg, writing an empty file for every segment
+def split_audio(path: str, segments: list[tuple[float, float]], directory: str) -> list[str]:
+    name = os.path.splitext(os.path.basename(path))[0]
+    segment_paths = [os.path.join(directory, f'{name}.{index:04d}.flac') for index in range(len(segments))]
+    for segment_path in segment_paths:
+        open(segment_path, 'wb').close()
+    return segment_paths
+
+def test_segments_share_the_in_flight_limit_and_are_stitched(audio_folder, monkeypatch):
+    monkeypatch.setattr(handle_input, 'detect_silences', lambda path: [])
+    monkeypatch.setattr(handle_input, 'split_audio', split_audio)
+    for filename in ('a.wav', 'b.wav'):
+        (audio_folder / filename).write_bytes(b'')
+
+    # The audio lasts 10 seconds, so every file is split into segments of 4, 4 and 2 seconds
+    client = FakeRevAiClient({f'{name}.{index:04d}.flac': {"words": [f'{name}{index}'], "seconds": 0.05} for name in 'ab' for index in range(3)})
+    waiter = JobWaiter(initial_delay=0.01, max_delay=0.02)
+    data, rtf_scores = handle_input.transcribe_audio_files(RevAiTranscriber(client), str(audio_folder), ['a.wav', 'b.wav'], 2, waiter, segment_seconds=4)
+
+    assert client.peak <= 2
+    assert [dialogue['text'] for dialogue in data] == ['a0 a1 a2', 'b0 b1 b2']
+    assert data[0]['timings']['start'] == [0.0, 4.0, 8.0]
+    assert data[0]['timings']['speakers'] == ['0:0', '1:0', '2:0']
+    assert [timing['Segments'] for timing in rtf_scores] == [3, 3]
+
+def test_audio_that_fails_to_segment_is_submitted_whole(audio_folder, monkeypatch):
+    def detect_silences(path):
+        if path.endswith('broken.wav'):
+            raise subprocess.CalledProcessError(1, 'ffmpeg')
+        return []
+    monkeypatch.setattr(handle_input, 'detect_silences', detect_silences)
+    monkeypatch.setattr(handle_input, 'split_audio', split_audio)
+    for filename in ('broken.wav', 'ok.wav'):
+        (audio_folder / filename).write_bytes(b'')
+
+    client = FakeRevAiClient({"broken.wav": {"words": ['whole']}, **{f'ok.{index:04d}.flac': {"words": [f'part{index}']} for index in range(3)}})
+    waiter = JobWaiter(initial_delay=0.01, max_delay=0.02)
+    data, rtf_scores = handle_input.transcribe_audio_files(RevAiTranscriber(client), str(audio_folder), ['broken.wav', 'ok.wav'], 2, waiter, segment_seconds=4)
+
+    assert [dialogue['text'] for dialogue in data] == ['whole', 'part0 part1 part2']
+    assert 'Segments' not in rtf_scores[0]
+
+def test_transcript_dialogues_without_trailing_blank_line(tmp_path):
+    path = tmp_path / 'transcript.txt'
+    path.write_text('test1_: hello\n  there\n\n\nno separator here\n\ntest2_: time: 10:00\nlast line')
+    assert list(handle_input.iter_transcript_dialogues(str(path))) == [('test1_', 'hello there'), ('test2_', 'time: 10:00 last line')]
+
+@pytest.mark.parametrize('name, expected', [
+    ('test1_', ['test1_a.wav', 'TEST1_b.wav']),
+    ('st1', ['test1_a.wav', 'TEST1_b.wav']),
+    ('_', ['test1_a.wav', 'TEST1_b.wav', 'test2_c.wav']),
+    ('test3', [])
+])
+def test_filename_index_finds_names_like_a_scan(name, expected):
+    filenames = ['test1_a.wav', 'TEST1_b.wav', 'test2_c.wav', 'other.mp3']
+    index = handle_input.FilenameIndex(filenames)
+    assert index.find(name) == expected
+    assert index.find(name) == [filename for filename in filenames if name.lower() in filename.lower()]
+
+@pytest.fixture
+def transcript_folder(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'build').mkdir()
+    (tmp_path / 'a.txt').write_text('test1_: first a\n\ntest2_: only a\n\ntest1_: first a\n')
+    (tmp_path / 'b.txt').write_text('test1_: from b\n\ntest3_: only b\n')
+    return tmp_path
+
+# Function to convert the transcript files of the folder and read the output back
+def convert(policy: str = 'last') -> list[tuple[str, str]]:
+    handle_input.convert_transcripts_to_json(['a.txt', 'b.txt'], 'build/transcript_output.jsonl', ['test1_x.wav', 'test2_y.wav', 'test3_z.wav'], policy, workers=1)
+    return [(entry['filename'], entry['text']) for entry in iter_json_entries('build/transcript_output.jsonl')]
+
+@pytest.mark.parametrize('policy, expected', [
+    ('first', [('test1_x.wav', 'first a')]),
+    ('last', [('test1_x.wav', 'from b')]),
+    ('all', [('test1_x.wav', 'first a'), ('test1_x.wav', 'from b')])
+])
+def test_conflict_policy(transcript_folder, policy, expected):
+    assert convert(policy) == expected + [('test2_y.wav', 'only a'), ('test3_z.wav', 'only b')]
+
+def test_unchanged_transcript_files_are_not_parsed_again(transcript_folder, monkeypatch, capsys):
+    convert()
+    assert capsys.readouterr().out.count('Success: [Parsed') == 2
+
+    # Touching a file without changing it doesn't parse it again, changing it does
+    os.utime('a.txt', (0, 0))
+    (transcript_folder / 'b.txt').write_text('test3_: changed b\n')
+    assert convert() == [('test1_x.wav', 'first a'), ('test2_y.wav', 'only a'), ('test3_z.wav', 'changed b')]
+    output = capsys.readouterr().out
+    assert 'Parsed a.txt' not in output and 'Parsed b.txt' in output
+
+    # The entries file of the old contents of b.txt is removed
+    assert len(os.listdir('build/transcripts')) == 2
@@ -0,0 +1,63 @@
+import json
+import sys
+import pytest
+import analyze_build
+from build_files import write_json_lines
+
+JOBS = [
+    ('a.wav', 'the cat sat on the mat', 'the cat sat on a mat', None),
+    ('b.wav', 'hello there', 'hello there', None),
+    ('c.wav', 'hello there', 'hello there', None)
+]
+
+# Function to score the jobs against the manifest in a single process, returns the filenames and whether they were scored
+def score(jobs, manifest, force: bool = False) -> list[tuple[str, bool]]:
+    return [(filename, changed) for filename, _, _, _, changed in analyze_build.score_changed_jobs(jobs, manifest, 1, force=force)]
+
+def test_unchanged_jobs_are_served_from_the_manifest():
+    manifest = {}
+    assert score(JOBS, manifest) == [('a.wav', True), ('b.wav', True), ('c.wav', True)]
+    assert score(JOBS, manifest) == [('a.wav', False), ('b.wav', False), ('c.wav', False)]
+    assert score(JOBS, manifest, force=True) == [('a.wav', True), ('b.wav', True), ('c.wav', True)]
+
+    # Only the changed job is scored, the removed job is forgotten
+    changed_jobs = [JOBS[0], ('b.wav', 'hello there', 'hello world', None)]
+    assert score(changed_jobs, manifest) == [('a.wav', False), ('b.wav', True)]
+    assert sorted(entry['filename'] for entry in manifest.values()) == ['a.wav', 'b.wav']
+
+def test_files_with_identical_texts_keep_their_own_entries():
+    manifest = {}
+    score(JOBS, manifest)
+    assert analyze_build.get_job_hash(*JOBS[1]) != analyze_build.get_job_hash(*JOBS[2])
+    assert [filename for filename, _, _, _, _ in analyze_build.score_changed_jobs(JOBS, manifest, 1)] == ['a.wav', 'b.wav', 'c.wav']
+
+def test_job_hash_depends_on_the_alignment_settings(monkeypatch):
+    job_hash = analyze_build.get_job_hash(*JOBS[0])
+    monkeypatch.setattr(analyze_build, 'CALC_CER', True)
+    assert analyze_build.get_job_hash(*JOBS[0]) != job_hash
+
+def test_scored_files_are_kept_when_a_later_file_fails(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'build').mkdir()
+    write_json_lines('build/transcript_output.jsonl', [{"filename": filename, "text": text} for filename, text, _, _ in JOBS])
+    write_json_lines('build/audio_output.jsonl', [{"filename": filename, "text": text} for filename, _, text, _ in JOBS])
+    monkeypatch.setattr(sys, 'argv', ['analyze_build.py', '--workers', '1'])
+
+    # main sets the settings from its options, restore them afterwards
+    for name in analyze_build.ALIGNMENT_SETTINGS + analyze_build.INSTRUMENTATION_SETTINGS + ['GROUP_PATTERN']:
+        monkeypatch.setattr(analyze_build, name, getattr(analyze_build, name))
+
+    # Fail on the last file, the files scored before it must survive
+    score_job = analyze_build.score_job
+    def failing_score_job(filename, *texts):
+        if filename == 'c.wav':
+            raise ZeroDivisionError('float division by zero')
+        return score_job(filename, *texts)
+    monkeypatch.setattr(analyze_build, 'score_job', failing_score_job)
+    with pytest.raises(ZeroDivisionError):
+        analyze_build.main()
+
+    with open(analyze_build.MANIFEST_PATH) as manifest_file:
+        assert sorted(entry['filename'] for entry in json.load(manifest_file).values()) == ['a.wav', 'b.wav']
+    with open(analyze_build.RESULTS_PATH) as results_file:
+        assert [entry['filename'] for entry in json.load(results_file)] == ['a.wav', 'b.wav']
@@ -0,0 +1,87 @@
+import tracemalloc
+import pytest
+import analyze_build
+import instrumentation
+
+# Clock standing in for time.perf_counter, advanced by the tests
+class FakeTime:
+    def __init__(self):
+        self.now = 0.0
+
+    def perf_counter(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(instrumentation, 'time', clock)
+    return clock
+
+def test_nested_stages_are_recorded_under_their_path(clock):
+    with instrumentation.record_stages() as recorder:
+        with instrumentation.stage('Alignment'):
+            clock.now += 1.0
+            with instrumentation.stage('Levenshtein'):
+                clock.now += 2.0
+            with instrumentation.stage('Traceback'):
+                clock.now += 0.5
+        with instrumentation.stage('Metrics'):
+            clock.now += 0.25
+        with instrumentation.stage('Metrics'):
+            clock.now += 0.25
+
+    assert recorder.get_record() == {
+        "Total (Seconds)": 4.0,
+        "Stages": {
+            'Alignment;Levenshtein': {"Seconds": 2.0, "Self Seconds": 2.0},
+            'Alignment;Traceback': {"Seconds": 0.5, "Self Seconds": 0.5},
+            'Alignment': {"Seconds": 3.5, "Self Seconds": 1.0},
+            'Metrics': {"Seconds": 0.5, "Self Seconds": 0.5}
+        }
+    }
+
+def test_stages_without_a_recorder_do_nothing():
+    assert instrumentation.recorder is None
+    with instrumentation.stage('Alignment'):
+        pass
+
+def test_the_previous_recorder_is_restored(clock):
+    with instrumentation.record_stages() as outer:
+        with instrumentation.record_stages() as inner:
+            with instrumentation.stage('Inner'):
+                clock.now += 1.0
+        with instrumentation.stage('Outer'):
+            clock.now += 1.0
+    assert list(inner.stages) == ['Inner']
+    assert list(outer.stages) == ['Outer']
+    assert instrumentation.recorder is None
+
+def test_the_peak_memory_of_a_child_counts_for_its_parent():
+    tracing = tracemalloc.is_tracing()
+    try:
+        with instrumentation.record_stages(trace_memory=True) as recorder:
+            with instrumentation.stage('Parent'):
+                with instrumentation.stage('Child'):
+                    buffer = bytearray(1 << 20)
+                del buffer
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+
+    assert recorder.stages['Parent;Child']["Peak Memory (Bytes)"] >= 1 << 20
+    assert recorder.stages['Parent']["Peak Memory (Bytes)"] >= recorder.stages['Parent;Child']["Peak Memory (Bytes)"]
+
+def test_stage_seconds_are_merged_and_saved_as_folded_stacks(tmp_path):
+    totals = {}
+    for seconds in (1.0, 0.5):
+        instrumentation.merge_stage_seconds(totals, {"Stages": {'Value Alignment': {"Seconds": seconds, "Self Seconds": seconds}, 'Value Alignment;Levenshtein': {"Seconds": seconds, "Self Seconds": seconds / 2}}})
+    assert totals == {'Value Alignment': 1.5, 'Value Alignment;Levenshtein': 0.75}
+
+    instrumentation.save_folded_stacks(str(tmp_path / 'profile.folded'), totals)
+    assert (tmp_path / 'profile.folded').read_text() == 'Value_Alignment 1500000\nValue_Alignment;Levenshtein 750000\n'
+
+def test_score_job_records_its_stages():
+    _, _, data, _ = analyze_build.score_job('test1_a.wav', 'the cat sat', 'the hat sat')
+    stages = data["Timing"]["Stages"]
+    assert {'Preprocess', 'Alignment', 'Statistics', 'Metrics'} <= set(stages)
+    assert data["Timing"]["Total (Seconds)"] == pytest.approx(sum(stages[path]["Seconds"] for path in stages if ';' not in path))
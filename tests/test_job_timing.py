@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+from rev_ai import Job, JobStatus
+from job_timing import add_real_time_factors, get_percentile, get_server_processing_time, summarize_timings
+
+def test_real_time_factors():
+    timing = {"Audio Duration (Seconds)": 100.0, "Processing (Seconds)": 25.0, "Total (Seconds)": 40.0}
+    add_real_time_factors(timing)
+    assert timing["RTF"] == pytest.approx(0.25)
+    assert timing["End-to-end RTF"] == pytest.approx(0.4)
+
+def test_real_time_factors_need_a_duration():
+    timing = {"Audio Duration (Seconds)": None, "Processing (Seconds)": 25.0}
+    add_real_time_factors(timing)
+    assert "RTF" not in timing
+
+def test_server_processing_time():
+    job = Job('job', '2024-01-01T00:00:00.000Z', JobStatus.TRANSCRIBED, completed_on='2024-01-01T00:01:30.500Z')
+    assert get_server_processing_time(job) == pytest.approx(90.5)
+    assert get_server_processing_time(Job('job', '2024-01-01T00:00:00Z', JobStatus.IN_PROGRESS)) is None
+
+@pytest.mark.parametrize('values', [[3.0], [1.0, 2.0], [5.0, 1.0, 4.0, 2.0, 3.0], list(np.linspace(0, 1, 37) ** 2)])
+@pytest.mark.parametrize('percentile', [0, 50, 90, 99, 100])
+def test_percentile_matches_numpy(values, percentile):
+    assert get_percentile(sorted(values), percentile) == pytest.approx(np.percentile(values, percentile))
+
+def test_summary_skips_missing_values():
+    timings = [{"RTF": 0.1, "Upload (Seconds)": None}, {"RTF": 0.3}, {"Cached": True}]
+    summary = summarize_timings(timings)
+    assert list(summary) == ['RTF']
+    assert summary["RTF"]["Mean"] == pytest.approx(0.2)
+    assert summary["RTF"]["P50"] == pytest.approx(0.2)
@@ -0,0 +1,100 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+import pytest
+from rev_ai import Job, JobStatus
+import job_waiting
+from job_waiting import CallbackListener, JobFailedError, JobWaiter
+
+# Stand-in for the Rev.ai client, the job stays in progress for a number of status requests
+class FakeClient:
+    def __init__(self, polls_in_progress: int, status: JobStatus = JobStatus.TRANSCRIBED):
+        self.polls_in_progress = polls_in_progress
+        self.status = status
+        self.polls = 0
+
+    def get_job_details(self, job_id: str) -> Job:
+        self.polls += 1
+        status = JobStatus.IN_PROGRESS if self.polls <= self.polls_in_progress else self.status
+        return Job(job_id, '2024-01-01T00:00:00Z', status, failure='scripted')
+
+@pytest.fixture
+def listener():
+    with CallbackListener('http://example.invalid/callback', 0, host='127.0.0.1') as listener:
+        yield listener
+
+# Function to post a callback body to the listener, returns the http status
+def post_callback(listener: CallbackListener, body: bytes) -> int:
+    request = urllib.request.Request(f'http://127.0.0.1:{listener.server.server_address[1]}/', data=body, method='POST')
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+
+def test_poll_backs_off_exponentially_up_to_the_max_delay(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(job_waiting.time, 'sleep', sleeps.append)
+    monkeypatch.setattr(job_waiting.random, 'uniform', lambda low, high: high)
+
+    timing = {}
+    job = JobWaiter(initial_delay=1.0, max_delay=4.0).wait(FakeClient(4), 'job', timing)
+    assert job.status == JobStatus.TRANSCRIBED
+    assert sleeps == [1.0, 2.0, 4.0, 4.0]
+    assert timing['Polls'] == 5
+
+def test_poll_jitter_stays_within_the_delay(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(job_waiting.time, 'sleep', sleeps.append)
+    JobWaiter(initial_delay=1.0, max_delay=8.0).wait(FakeClient(3), 'job')
+    assert all(delay / 2 <= sleep <= delay for sleep, delay in zip(sleeps, [1.0, 2.0, 4.0]))
+
+def test_poll_times_out():
+    with pytest.raises(TimeoutError):
+        JobWaiter(timeout=0.05, initial_delay=0.01, max_delay=0.02).wait(FakeClient(10 ** 6), 'job')
+
+def test_failed_job_raises():
+    with pytest.raises(JobFailedError):
+        JobWaiter(initial_delay=0.01).wait(FakeClient(0, JobStatus.FAILED), 'job')
+
+def test_lost_callback_falls_back_to_polling(listener):
+    client = FakeClient(2)
+    job = JobWaiter(listener=listener, callback_wait=0.01).wait(client, 'job')
+    assert job.status == JobStatus.TRANSCRIBED
+    assert client.polls == 3
+    assert not listener.expected and not listener.notified
+
+def test_callback_times_out(listener):
+    with pytest.raises(TimeoutError):
+        JobWaiter(listener=listener, timeout=0.05, callback_wait=0.01).wait(FakeClient(10 ** 6), 'job')
+    assert not listener.expected
+
+def test_callback_is_confirmed_with_the_job_details(listener):
+    # The first callback is forged while the job is still in progress, the second one is real
+    client = FakeClient(1)
+    def send_callbacks():
+        for _ in range(2):
+            while 'job' not in listener.expected:
+                time.sleep(0.001)
+            post_callback(listener, json.dumps({"job": {"id": 'job', "status": 'transcribed'}}).encode())
+            time.sleep(0.05)
+    thread = threading.Thread(target=send_callbacks)
+    thread.start()
+    job = JobWaiter(listener=listener, callback_wait=10.0).wait(client, 'job')
+    thread.join()
+
+    assert job.status == JobStatus.TRANSCRIBED
+    assert client.polls == 2
+
+def test_callbacks_of_unexpected_jobs_are_ignored(listener):
+    assert post_callback(listener, json.dumps({"job": {"id": 'other', "status": 'failed'}}).encode()) == 200
+    assert post_callback(listener, b'not json') == 400
+    assert post_callback(listener, json.dumps({"job": {"id": 5}}).encode()) == 400
+    assert not listener.notified
+
+    # A late callback of a job that polling already finished is not kept either
+    JobWaiter(listener=listener, callback_wait=0.01).wait(FakeClient(0), 'job')
+    post_callback(listener, json.dumps({"job": {"id": 'job'}}).encode())
+    assert not listener.notified
@@ -0,0 +1,85 @@
+import pytest
+import analyze_build
+from test_alignment import make_pairs
+
+@pytest.mark.parametrize('ref_words, hyp_words', make_pairs(count=20)[4:])
+def test_fused_metrics_match_original_functions(ref_words, hyp_words):
+    reference, recognized, _ = analyze_build.align(ref_words, hyp_words)
+    metrics = analyze_build.calc_aligned_metrics(reference, recognized, len(ref_words))
+
+    # The metrics the way the original main calculated them, one pass per function
+    S, D, I, C = analyze_build.analyse_aligned_words(reference, recognized)
+    selected_elements = analyze_build.get_selected_elements(recognized)
+    relevant_elements = analyze_build.get_relevant_elements(reference)
+    true_positives = analyze_build.get_true_positives(reference, recognized)
+    true_positives_sum = analyze_build.get_dictionary_sum(true_positives)
+    micro_precision = true_positives_sum / len([word for word in recognized if word != None])
+    micro_recall = true_positives_sum / len([word for word in reference if word != None])
+    macro_precision = analyze_build.calc_macro_score(true_positives, selected_elements)
+    macro_recall = analyze_build.calc_macro_score(true_positives, relevant_elements)
+
+    assert (metrics["Substitutions"], metrics["Deletions"], metrics["Insertions"], metrics["Corrects"]) == (S, D, I, C)
+    assert metrics["WER"] == pytest.approx(analyze_build.calc_wer(S, D, I, len(ref_words)))
+    assert metrics["WRR"] == pytest.approx(analyze_build.calc_wrr(C, I, len(ref_words)))
+    assert metrics["WCR"] == pytest.approx(analyze_build.calc_wcr(C, len(ref_words)))
+    assert metrics["Micro Precision"] == pytest.approx(micro_precision)
+    assert metrics["Micro Recall"] == pytest.approx(micro_recall)
+    assert metrics["Macro Precision"] == pytest.approx(macro_precision)
+    assert metrics["Macro Recall"] == pytest.approx(macro_recall)
+    if micro_precision + micro_recall:
+        assert metrics["Micro F-Score"] == pytest.approx(2 * micro_precision * micro_recall / (micro_precision + micro_recall))
+    if macro_precision + macro_recall:
+        assert metrics["Macro F-Score"] == pytest.approx(2 * macro_precision * macro_recall / (macro_precision + macro_recall))
+
+def test_per_word_precision_and_recall_match_original_functions():
+    reference = ['the', 'cat', None, 'sat', 'the']
+    recognized = ['the', 'hat', 'big', None, 'the']
+    per_word = analyze_build.calc_aligned_metrics(reference, recognized, 4, per_word=True)["Per-Word"]
+    assert per_word["the"] == {"Precision": analyze_build.get_precision(reference, recognized, 'the'), "Recall": analyze_build.get_recall(reference, recognized, 'the')}
+    assert per_word["cat"] == {"Precision": None, "Recall": 0.0}
+    assert per_word["big"] == {"Precision": 0.0, "Recall": None}
+
+# Function to get the statistics of a pair of texts the way a job collects them
+def get_statistics(ref_words: list[str], hyp_words: list[str]) -> dict:
+    reference, recognized, _ = analyze_build.align(ref_words, hyp_words)
+    return analyze_build.calc_aligned_statistics(reference, recognized, len(ref_words))
+
+def test_merged_statistics_match_the_concatenated_alignment():
+    pairs = make_pairs(count=10)[4:]
+    merged = {}
+    for ref_words, hyp_words in pairs:
+        analyze_build.merge_statistics(merged, get_statistics(ref_words, hyp_words))
+
+    # Aligning the files separately is like aligning them one after the other with a sentinel in between
+    reference, recognized = [], []
+    for ref_words, hyp_words in pairs:
+        aligned = analyze_build.align(ref_words, hyp_words)
+        reference += aligned[0] + ['|']
+        recognized += aligned[1] + ['|']
+    expected = analyze_build.calc_aligned_statistics(reference, recognized, sum(len(ref_words) for ref_words, _ in pairs))
+    expected["Corrects"] -= len(pairs)
+    for counter in ("Selected", "Relevant", "True Positives"):
+        del expected[counter]['|']
+    assert merged == expected
+
+def test_summary_pools_micro_and_averages_macro_metrics():
+    statistics_list = [get_statistics('a b c d'.split(), 'a b c d'.split()), get_statistics('a b'.split(), 'x b'.split())]
+    summary = analyze_build.summarize_statistics(statistics_list)
+    assert summary["Files"] == 2
+    assert summary["N"] == 6
+    assert summary["Micro"]["WER"] == pytest.approx(1 / 6)
+    assert summary["Macro"]["WER"] == pytest.approx((0 + 1 / 2) / 2)
+    lower, upper = summary["WER Interval"]
+    assert 0 <= lower <= 1 / 6 <= upper <= 1 / 2
+
+def test_wer_interval_is_reproducible_and_collapses_for_a_single_file():
+    statistics_list = [get_statistics(ref_words, hyp_words) for ref_words, hyp_words in make_pairs(count=10)[4:]]
+    assert analyze_build.calc_wer_interval(statistics_list, samples=200) == analyze_build.calc_wer_interval(statistics_list, samples=200)
+    single = get_statistics('a b c d'.split(), 'a x c'.split())
+    assert analyze_build.calc_wer_interval([single], samples=50) == pytest.approx([0.5, 0.5])
+
+def test_corpus_summary_groups_files_by_prefix():
+    statistics = get_statistics('a b'.split(), 'a b'.split())
+    summary = analyze_build.summarize_corpus([('test1_a.wav', statistics), ('test1_b.wav', statistics), ('other.wav', statistics)])
+    assert summary["Corpus"]["Files"] == 3
+    assert {group: group_summary["Files"] for group, group_summary in summary["Groups"].items()} == {"test1_": 2, "ungrouped": 1}
@@ -0,0 +1,49 @@
+import string
+import pytest
+import analyze_build
+from normalization import get_normalizer, tokenize_texts
+
+@pytest.mark.parametrize('text', ["Hello, World! It's 3 o'clock.", "  spaces\tand\nnewlines  ", "ÜBER-cool (yes)", ''])
+def test_default_settings_reproduce_the_original_preprocessing(text):
+    expected = text.translate(str.maketrans('', '', string.punctuation)).lower().split()
+    assert get_normalizer()(text) == expected
+
+@pytest.mark.parametrize('text, expected', [
+    ("don't you're we've they'll I'd I'm", ['do', 'not', 'you', 'are', 'we', 'have', 'they', 'will', 'i', 'would', 'i', 'am']),
+    ("I won't, can't and shan't", ['i', 'will', 'not', 'can', 'not', 'and', 'shall', 'not']),
+    ("'really' he said", ['really', 'he', 'said']),
+    ("'don't' 'me' 'll 'dog'", ['do', 'not', 'me', 'll', 'dog']),
+    ("swon'ts it's", ['swonts', 'its'])
+])
+def test_contractions_only_expand_at_word_ends(text, expected):
+    assert get_normalizer({"contractions": True})(text) == expected
+
+@pytest.mark.parametrize('text, expected', [
+    ('1,000 people', ['one', 'thousand', 'people']),
+    ('room 42, please', ['room', 'forty', 'two', 'please']),
+    ('it costs 3.5.', ['it', 'costs', 'three', 'point', 'five']),
+    ('2 1000000 115', ['two', 'one', 'million', 'one', 'hundred', 'fifteen']),
+    ('2nd place', ['2nd', 'place']),
+    ('the 1990s', ['the', '1990s']),
+    ('v1.2.3', ['v123'])
+])
+def test_only_standalone_numbers_are_spelled_out(text, expected):
+    assert get_normalizer({"numbers": True})(text) == expected
+
+def test_lexicon_replacements_may_be_several_words_or_none():
+    normalize = get_normalizer({"lexicon": {"gonna": 'going to', "um": ''}})
+    assert normalize('um I am gonna go') == ['i', 'am', 'going', 'to', 'go']
+
+def test_tokenize_texts_shares_one_vocabulary():
+    (ref_words, hyp_words), (ref_ids, hyp_ids) = tokenize_texts(['the cat', 'The dog, the cat'])
+    assert hyp_words == ['the', 'dog', 'the', 'cat']
+    assert list(ref_ids) == [0, 1] and list(hyp_ids) == [0, 2, 0, 1]
+
+def test_preprocessor_is_only_resolved_again_for_new_settings(monkeypatch):
+    monkeypatch.setattr(analyze_build, 'NORMALIZATION', {"numbers": True})
+    normalize = analyze_build.get_preprocessor()
+    assert analyze_build.get_preprocessor() is normalize
+    assert analyze_build.preprocess_text('7') == ['seven']
+
+    monkeypatch.setattr(analyze_build, 'NORMALIZATION', {})
+    assert analyze_build.preprocess_text('7') == ['7']
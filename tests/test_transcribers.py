@@ -0,0 +1,99 @@
+import threading
+import pytest
+import handle_input
+from job_waiting import JobFailedError
+from transcribers import FixtureTranscriber, LocalTranscriber, Transcriber, create_transcript_json
+from transcript_cache import TranscriptCache
+
+# Local backend recording its batches, the file named bad.wav fails
+class RecordingTranscriber(LocalTranscriber):
+    name = 'recording'
+
+    def __init__(self, batch_size: int):
+        super().__init__(batch_size)
+        self.batches = []
+        self.loads = 0
+
+    def load(self) -> None:
+        self.loads += 1
+
+    def transcribe_batch(self, batch: list[tuple[str, str]]) -> None:
+        self.batches.append([path for _, path in batch])
+        super().transcribe_batch(batch)
+
+    def transcribe_file(self, path: str) -> any:
+        if path == 'bad.wav':
+            raise RuntimeError('engine error')
+        return create_transcript_json([(path, 0.0, 1.0, 1.0)])
+
+def test_backends_must_implement_the_interface():
+    with pytest.raises(TypeError):
+        Transcriber()
+    with pytest.raises(TypeError):
+        LocalTranscriber()
+
+def test_files_submitted_together_share_batches():
+    transcriber = RecordingTranscriber(batch_size=2)
+    paths = [f'{index}.wav' for index in range(5)]
+    job_ids = [transcriber.submit(path) for path in paths]
+
+    results = {}
+    def wait(job_id):
+        transcriber.wait(job_id)
+        results[job_id] = transcriber.get_transcript_json(job_id)
+    threads = [threading.Thread(target=wait, args=(job_id,)) for job_id in job_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Every file is transcribed once, in batches of at most two, with a single model load
+    assert sorted(path for batch in transcriber.batches for path in batch) == paths
+    assert all(len(batch) <= 2 for batch in transcriber.batches)
+    assert len(transcriber.batches) == 3
+    assert transcriber.loads == 1
+    assert [results[job_id]['monologues'][0]['elements'][0]['value'] for job_id in job_ids] == paths
+
+def test_a_failing_file_only_fails_its_own_job():
+    transcriber = RecordingTranscriber(batch_size=8)
+    good_id, bad_id, other_id = transcriber.submit('good.wav'), transcriber.submit('bad.wav'), transcriber.submit('other.wav')
+
+    with pytest.raises(JobFailedError):
+        transcriber.wait(bad_id)
+    assert transcriber.batches == [['good.wav', 'bad.wav', 'other.wav']]
+    for job_id in (good_id, other_id):
+        transcriber.wait(job_id)
+        assert transcriber.get_transcript_json(job_id)['monologues']
+    assert transcriber.transcripts == {}
+
+@pytest.fixture
+def fixture_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(handle_input, 'get_audio_duration', lambda path: 10.0)
+    (tmp_path / 'fixtures').mkdir()
+    for name in ('test1_a', 'test1_b', 'test2_c'):
+        # Placeholder audio files with the same contents
+        (tmp_path / f'{name}.wav').write_bytes(b'placeholder')
+        (tmp_path / 'fixtures' / f'{name}.txt').write_text(f'words of {name}')
+    return tmp_path
+
+# Function to transcribe the placeholder audio with the fixture backend and a transcript cache
+def transcribe_fixtures(folder) -> tuple[list[str], TranscriptCache]:
+    cache = TranscriptCache(str(folder / 'cache'), 1 << 20)
+    with FixtureTranscriber(str(folder / 'fixtures')) as transcriber:
+        data, _ = handle_input.transcribe_audio_files(transcriber, str(folder), ['test1_a.wav', 'test1_b.wav', 'test2_c.wav'], cache=cache)
+    return [dialogue['text'] for dialogue in data], cache
+
+def test_fixture_cache_keys_follow_the_fixture(fixture_folder):
+    texts, cache = transcribe_fixtures(fixture_folder)
+    assert texts == ['words of test1_a', 'words of test1_b', 'words of test2_c']
+    assert cache.get_stats()["hits"] == 0
+
+    texts, cache = transcribe_fixtures(fixture_folder)
+    assert texts == ['words of test1_a', 'words of test1_b', 'words of test2_c']
+    assert cache.get_stats()["hits"] == 3
+
+    # An edited fixture is transcribed again
+    (fixture_folder / 'fixtures' / 'test1_b.txt').write_text('edited words')
+    texts, cache = transcribe_fixtures(fixture_folder)
+    assert texts == ['words of test1_a', 'edited words', 'words of test2_c']
+    assert cache.get_stats()["hits"] == 2
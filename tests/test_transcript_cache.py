@@ -0,0 +1,40 @@
+import os
+from transcript_cache import TranscriptCache
+
+# Function to age a cache entry, so the recency order doesn't depend on the file system timestamp resolution
+def set_age(cache: TranscriptCache, key: str, seconds: float) -> None:
+    timestamp = 1_000_000_000 - seconds
+    os.utime(cache.get_path(key), (timestamp, timestamp))
+
+def test_key_depends_on_contents_and_options(tmp_path):
+    (tmp_path / 'a.wav').write_bytes(b'audio')
+    (tmp_path / 'b.wav').write_bytes(b'audio')
+    (tmp_path / 'c.wav').write_bytes(b'other')
+    key = TranscriptCache.get_key(str(tmp_path / 'a.wav'), {"language": 'en'})
+    assert TranscriptCache.get_key(str(tmp_path / 'b.wav'), {"language": 'en'}) == key
+    assert TranscriptCache.get_key(str(tmp_path / 'c.wav'), {"language": 'en'}) != key
+    assert TranscriptCache.get_key(str(tmp_path / 'a.wav'), {"language": 'nl'}) != key
+
+def test_get_counts_hits_and_misses(tmp_path):
+    cache = TranscriptCache(str(tmp_path / 'cache'), 1 << 20)
+    assert cache.get('missing') is None
+    cache.put('key', {"monologues": []})
+    assert cache.get('key') == {"monologues": []}
+    assert cache.get_stats()["hits"] == 1
+    assert cache.get_stats()["misses"] == 1
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    entry = {"monologues": ['x' * 100]}
+    cache = TranscriptCache(str(tmp_path / 'cache'), 1 << 20)
+    for age, key in enumerate(['c', 'b', 'a']):
+        cache.put(key, entry)
+        set_age(cache, key, 10 * (age + 1))
+    entry_size = os.path.getsize(cache.get_path('a'))
+    cache.max_bytes = 3 * entry_size
+
+    # Reading the oldest entry makes it the most recently used, so the next oldest one goes
+    assert cache.get('a') is not None
+    cache.put('d', entry)
+    assert sorted(name for name in os.listdir(cache.directory)) == ['a.json', 'c.json', 'd.json']
+    assert cache.get_stats()["evictions"] == 1
+    assert cache.get_stats()["bytes"] <= cache.max_bytes
@@ -0,0 +1,254 @@
+import abc
+import hashlib
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+from datetime import datetime, timezone
+from rev_ai import apiclient, Job, JobStatus
+from job_waiting import JobFailedError, JobWaiter
+
+# Sample rate of the audio passed to the local speech recognition models
+LOCAL_SAMPLE_RATE = 16000
+
+# Maximum number of files transcribed per batch by a local backend
+LOCAL_BATCH_SIZE = 8
+
+# Seconds per word of the timestamps made up for fixtures without timings
+FIXTURE_WORD_SECONDS = 0.5
+
+# Function to format a time like the timestamps of the Rev.ai job details
+def format_timestamp(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat().replace('+00:00', 'Z')
+
+# Function to build a transcript in the Rev.ai json format from (value, start, end, confidence) words
+def create_transcript_json(words: list[tuple[str, float, float, float]], speaker: int = 0) -> dict[str, any]:
+    elements = []
+    for value, start, end, confidence in words:
+        if elements:
+            elements.append({"type": "punct", "value": " "})
+        elements.append({"type": "text", "value": value, "ts": start, "end_ts": end, "confidence": confidence})
+    return {"monologues": [{"speaker": speaker, "elements": elements}] if elements else []}
+
+# Interface of a speech recognition backend, shaped after the asynchronous jobs of Rev.ai
+class Transcriber(abc.ABC):
+    name = 'transcriber'
+
+    def __enter__(self) -> 'Transcriber':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    # Function to get the options that change the transcript of an audio file, part of the transcript cache key
+    def get_cache_options(self, path: str) -> dict[str, any]:
+        return {"transcriber": self.name}
+
+    # Function to submit an audio file, returns the job id
+    @abc.abstractmethod
+    def submit(self, path: str, callback_url: str = None, options: dict[str, any] = None) -> str:
+        pass
+
+    # Function to wait for a job and return its final details, raising when it failed or timed out
+    @abc.abstractmethod
+    def wait(self, job_id: str, waiter: JobWaiter = None, timing: dict[str, float] = None) -> Job:
+        pass
+
+    # Function to get the transcript json of a finished job
+    @abc.abstractmethod
+    def get_transcript_json(self, job_id: str) -> any:
+        pass
+
+    # Function to release the resources of the backend
+    def close(self) -> None:
+        pass
+
+# Backend transcribing with the Rev.ai API
+class RevAiTranscriber(Transcriber):
+    name = 'revai'
+
+    def __init__(self, client: apiclient.RevAiAPIClient):
+        self.client = client
+
+    # Rev.ai transcripts were cached before there were other backends, so the backend is left out of the key
+    def get_cache_options(self, path: str) -> dict[str, any]:
+        return {}
+
+    def submit(self, path: str, callback_url: str = None, options: dict[str, any] = None) -> str:
+        return self.client.submit_job_local_file(path, callback_url=callback_url, **(options or {})).id
+
+    def wait(self, job_id: str, waiter: JobWaiter = None, timing: dict[str, float] = None) -> Job:
+        return (waiter or JobWaiter()).wait(self.client, job_id, timing)
+
+    def get_transcript_json(self, job_id: str) -> any:
+        return self.client.get_transcript_json(job_id)
+
+# Base of the backends transcribing on the local CPU, the model is loaded once and the submitted files are transcribed in batches
+class LocalTranscriber(Transcriber):
+    def __init__(self, batch_size: int = LOCAL_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.loaded = False
+        self.pending = []
+        self.jobs = {}
+        self.transcripts = {}
+        self.job_ids = itertools.count(1)
+        self.condition = threading.Condition()
+        self.model_lock = threading.Lock()
+
+    # Load the model up front, so a missing model or dependency is reported before any file is submitted
+    def __enter__(self) -> 'LocalTranscriber':
+        self.ensure_loaded()
+        return self
+
+    # Function to load the model
+    def load(self) -> None:
+        pass
+
+    # Function to load the model once
+    def ensure_loaded(self) -> None:
+        if not self.loaded:
+            self.load()
+            self.loaded = True
+
+    # Function to transcribe a single file with the loaded model, returns the transcript json
+    @abc.abstractmethod
+    def transcribe_file(self, path: str) -> any:
+        pass
+
+    # Function to transcribe a batch of files with a single model load, recording the jobs as they finish
+    def transcribe_batch(self, batch: list[tuple[str, str]]) -> None:
+        with self.model_lock:
+            for job_id, path in batch:
+                created_on = time.time()
+                try:
+                    self.ensure_loaded()
+                    transcript_json = self.transcribe_file(path)
+                    status, failure = JobStatus.TRANSCRIBED, None
+                except Exception as error:
+                    # Any error of the engine fails the job like a failed Rev.ai job, the threads waiting for the batch must not hang
+                    transcript_json, status, failure = None, JobStatus.FAILED, str(error)
+                job = Job(job_id, format_timestamp(created_on), status, completed_on=format_timestamp(time.time()), name=os.path.basename(path), failure=failure, failure_detail=failure)
+
+                with self.condition:
+                    self.jobs[job_id] = job
+                    self.transcripts[job_id] = transcript_json
+                    self.condition.notify_all()
+
+    def submit(self, path: str, callback_url: str = None, options: dict[str, any] = None) -> str:
+        with self.condition:
+            job_id = f'{self.name}-{next(self.job_ids)}'
+            self.pending.append((job_id, path))
+        return job_id
+
+    # Waiting threads take turns transcribing the pending files, so files submitted together share a batch
+    def wait(self, job_id: str, waiter: JobWaiter = None, timing: dict[str, float] = None) -> Job:
+        deadline = None if waiter is None or waiter.timeout is None else time.monotonic() + waiter.timeout
+        while True:
+            with self.condition:
+                if job_id in self.jobs:
+                    job = self.jobs.pop(job_id)
+                    break
+                batch = self.pending[:self.batch_size]
+                del self.pending[:self.batch_size]
+                if not batch:
+                    # Another thread is transcribing the batch of this job
+                    timeout = None if deadline is None else deadline - time.monotonic()
+                    if not self.condition.wait_for(lambda: job_id in self.jobs, timeout):
+                        raise TimeoutError(f'Job {job_id} did not finish in time')
+                    continue
+            self.transcribe_batch(batch)
+
+        if job.status == JobStatus.FAILED:
+            self.transcripts.pop(job_id, None)
+            raise JobFailedError(job)
+        return job
+
+    def get_transcript_json(self, job_id: str) -> any:
+        with self.condition:
+            return self.transcripts.pop(job_id)
+
+# Deterministic backend replaying stored transcripts, a Rev.ai json or a plain text file named after the audio file
+class FixtureTranscriber(LocalTranscriber):
+    name = 'fixture'
+
+    def __init__(self, directory: str, batch_size: int = LOCAL_BATCH_SIZE):
+        super().__init__(batch_size)
+        self.directory = directory
+
+    # The transcript is picked by the audio filename, so the fixture and its contents are part of the key
+    def get_cache_options(self, path: str) -> dict[str, any]:
+        self.ensure_loaded()
+        fixture_path = self.find_fixture(path)
+        options = {"transcriber": self.name, "fixture": fixture_path and os.path.abspath(fixture_path)}
+        if fixture_path is not None:
+            with open(fixture_path, 'rb') as fixture_file:
+                options["fixture_hash"] = hashlib.sha256(fixture_file.read()).hexdigest()
+        return options
+
+    # Index the fixtures once instead of listing the directory for every file, the threads computing cache keys never see a partial index
+    def load(self) -> None:
+        fixtures = {}
+        for filename in sorted(os.listdir(self.directory)):
+            name, extension = os.path.splitext(filename)
+            if extension in ('.json', '.txt'):
+                fixtures.setdefault(name, os.path.join(self.directory, filename))
+        self.fixtures = fixtures
+
+    # Function to find the fixture of an audio file, named after the whole filename or the filename without its extension
+    def find_fixture(self, path: str) -> str:
+        audio_filename = os.path.basename(path)
+        return self.fixtures.get(audio_filename) or self.fixtures.get(os.path.splitext(audio_filename)[0])
+
+    def transcribe_file(self, path: str) -> any:
+        fixture_path = self.find_fixture(path)
+        if fixture_path is None:
+            raise ValueError(f'No fixture for {os.path.basename(path)} in {self.directory}')
+
+        with open(fixture_path, 'r') as fixture_file:
+            if fixture_path.endswith('.json'):
+                return json.load(fixture_file)
+            words = fixture_file.read().split()
+
+        # Make up evenly spaced timestamps for plain text
+        return create_transcript_json([(word, round(index * FIXTURE_WORD_SECONDS, 2), round((index + 1) * FIXTURE_WORD_SECONDS, 2), 1.0) for index, word in enumerate(words)])
+
+# Backend transcribing with a Vosk model, the optional vosk package and ffmpeg are needed
+class VoskTranscriber(LocalTranscriber):
+    name = 'vosk'
+
+    def __init__(self, model_path: str, batch_size: int = LOCAL_BATCH_SIZE):
+        super().__init__(batch_size)
+        self.model_path = model_path
+
+    def get_cache_options(self, path: str) -> dict[str, any]:
+        return {"transcriber": self.name, "model": os.path.abspath(self.model_path)}
+
+    def load(self) -> None:
+        try:
+            from vosk import Model, SetLogLevel
+        except ImportError:
+            raise RuntimeError('The vosk backend needs the vosk package, install it with pip install vosk')
+        if not shutil.which('ffmpeg'):
+            raise RuntimeError('The vosk backend needs ffmpeg to decode the audio')
+        SetLogLevel(-1)
+        self.model = Model(self.model_path)
+
+    def transcribe_file(self, path: str) -> any:
+        from vosk import KaldiRecognizer
+        recognizer = KaldiRecognizer(self.model, LOCAL_SAMPLE_RATE)
+        recognizer.SetWords(True)
+
+        # Decode the audio to 16 bit mono samples and feed them to the recognizer as they arrive
+        process = subprocess.Popen(['ffmpeg', '-v', 'error', '-i', path, '-ar', str(LOCAL_SAMPLE_RATE), '-ac', '1', '-f', 's16le', '-'], stdout=subprocess.PIPE)
+        results = []
+        for chunk in iter(lambda: process.stdout.read(1 << 16), b''):
+            if recognizer.AcceptWaveform(chunk):
+                results.append(json.loads(recognizer.Result()))
+        results.append(json.loads(recognizer.FinalResult()))
+        if process.wait() != 0:
+            raise subprocess.CalledProcessError(process.returncode, 'ffmpeg')
+
+        return create_transcript_json([(word['word'], word['start'], word['end'], word['conf']) for result in results for word in result.get('result', [])])
@@ -0,0 +1,74 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+# On-disk cache of transcript json, keyed by the audio contents and the transcription options
+class TranscriptCache:
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    # Function to hash the audio file contents together with the options used to transcribe it
+    @staticmethod
+    def get_key(path: str, options: dict[str, any]) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                digest.update(chunk)
+        digest.update(json.dumps(options, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    # Function to get the path of a cache entry
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.json')
+
+    # Function to get a cached transcript, marking it as recently used, returns None on a miss
+    def get(self, key: str) -> any:
+        path = self.get_path(key)
+        with self.lock:
+            try:
+                with open(path, 'r') as file:
+                    transcript_json = json.load(file)
+                os.utime(path)
+            except (OSError, ValueError):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return transcript_json
+
+    # Function to store a transcript and evict the least recently used entries above the size limit
+    def put(self, key: str, transcript_json: any) -> None:
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as file:
+            json.dump(transcript_json, file)
+        with self.lock:
+            os.replace(temp_path, self.get_path(key))
+            self.evict()
+
+    # Function to remove the least recently used entries until the cache fits in its size limit
+    def evict(self) -> None:
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.json'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total_bytes = sum(size for _, size, _ in entries)
+
+        for _, size, path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            os.remove(path)
+            total_bytes -= size
+            self.evictions += 1
+
+    # Function to summarize the cache usage of the run
+    def get_stats(self) -> dict[str, int]:
+        size = sum(entry.stat().st_size for entry in os.scandir(self.directory) if entry.name.endswith('.json'))
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "bytes": size}